@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Court, Booking
+from .models import Court, Booking, BookingSeries
 
 @admin.register(Court)
 class CourtAdmin(admin.ModelAdmin):
@@ -11,4 +11,11 @@ class CourtAdmin(admin.ModelAdmin):
 class BookingAdmin(admin.ModelAdmin):
     list_display = ['user', 'court', 'date', 'start_time', 'end_time', 'status']
     list_filter = ['status', 'date']
-    search_fields = ['user__username', 'court__name']
\ No newline at end of file
+    search_fields = ['user__username', 'court__name']
+
+@admin.register(BookingSeries)
+class BookingSeriesAdmin(admin.ModelAdmin):
+    list_display = ['user', 'court', 'weekday', 'start_time', 'end_time', 'start_date', 'end_date', 'is_active']
+    list_filter = ['is_active', 'weekday', 'court']
+    search_fields = ['user__username', 'court__name']
+    readonly_fields = ['materialized_until']
@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from paddle_booking import caching
+
+# Код, который читает ключ из кэша в отдельном процессе
+CHILD_SCRIPT = """
+import sys
+import django
+django.setup()
+from django.core.cache import cache
+from paddle_booking import caching
+key = sys.argv[1]
+value = cache.get(key)
+caching.bump_version(key)
+print(value)
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет настроенный кэш: основные операции и видимость записей '
+        'из другого процесса (нужна для сброса кэша слотов при нескольких процессах)'
+    )
+
+    def handle(self, *args, **options):
+        config = settings.CACHES['default']
+        self.stdout.write(f"Бэкенд: {config['BACKEND']}")
+        self.stdout.write(f"Адрес: {config.get('LOCATION', '')}")
+
+        key = caching.make_key('cache_check', uuid.uuid4().hex)
+        try:
+            started = time.perf_counter()
+            self.check_operations(key)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            raise CommandError(f'Кэш недоступен: {e}')
+        self.stdout.write(f'Основные операции: OK ({elapsed_ms:.1f} мс)')
+
+        try:
+            shared = self.check_shared(key)
+        finally:
+            cache.delete(key)
+
+        if shared:
+            self.stdout.write(self.style.SUCCESS('Кэш общий для процессов: сброс виден всем процессам'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                'Кэш не общий: другой процесс не видит записи этого процесса. '
+                'Запускайте сервер в одном процессе или смените CACHE_BACKEND'
+            ))
+
+    def check_operations(self, key):
+        """set/get, add, incr, get_many и delete_many - все, чем пользуется приложение"""
+        other = f'{key}:other'
+        cache.set(key, 1, 60)
+        if cache.get(key) != 1:
+            raise CommandError('записанное значение не прочитано')
+        if cache.add(key, 2, 60):
+            raise CommandError('add перезаписал существующий ключ')
+        if cache.incr(key) != 2:
+            raise CommandError('incr вернул неверное значение')
+        cache.set(other, 'x', 60)
+        if cache.get_many([key, other]) != {key: 2, other: 'x'}:
+            raise CommandError('get_many вернул неверные значения')
+        cache.delete_many([other])
+        if cache.get(other) is not None:
+            raise CommandError('delete_many не удалил ключ')
+
+    def check_shared(self, key):
+        """Другой процесс читает ключ этого процесса и меняет его версию"""
+        cache.set(key, 2, 60)
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'paddle_booking.settings'
+        ))
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT, key],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=60
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Проверочный процесс завершился с ошибкой:\n{result.stderr}')
+
+        seen = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ''
+        return seen == '2' and cache.get(key) == 3
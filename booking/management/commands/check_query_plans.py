@@ -0,0 +1,84 @@
+import re
+from datetime import date, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from booking.models import Booking, BookingSeries, BookingSlot, CourtOccupancy, ACTIVE_STATUSES
+
+
+# Признаки полного просмотра таблицы в плане запроса
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (booking_\w+)(?! USING (?:COVERING )?INDEX)'),
+    'postgresql': re.compile(r'Seq Scan on (booking_\w+)'),
+}
+
+
+def hot_queries():
+    """Горячие запросы к бронированиям: (название, queryset)"""
+    court_id, user_id = 1, 1
+    day = date.today()
+
+    return [
+        ('Карта занятости / слоты', Booking.objects.filter(
+            court_id=court_id, date=day, status__in=ACTIVE_STATUSES
+        ).values_list('start_time', 'end_time')),
+        ('Поиск конфликта в create_booking', BookingSlot.objects.filter(
+            court_id=court_id, date=day, hour__in=[10, 11]
+        ).select_related('booking')),
+        ('Матрица доступности', Booking.objects.filter(
+            court_id__in=[1, 2, 3], date__range=(day, day), status__in=ACTIVE_STATUSES
+        ).values_list('court_id', 'date', 'start_time', 'end_time')),
+        ('Регулярные серии на дату', BookingSeries.objects.active_between(
+            [court_id], day, day
+        ).filter(weekday=day.weekday())),
+        ('Маска занятости дня', CourtOccupancy.objects.filter(
+            court_id=court_id, date=day
+        ).values_list('mask', flat=True)),
+        ('Бронирования в профиле', Booking.objects.filter(
+            user_id=user_id
+        ).select_related('court').order_by('-date', '-start_time')),
+        ('Предстоящие бронирования в профиле', Booking.objects.filter(
+            Q(date__gt=day) | Q(date=day, start_time__gt=time(12)),
+            user_id=user_id,
+            status__in=ACTIVE_STATUSES
+        )),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Проверяет, что горячие запросы к бронированиям используют индексы'
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        pattern = FULL_SCAN_PATTERNS.get(vendor)
+        if pattern is None:
+            self.stdout.write(self.style.WARNING(
+                f'Проверка планов для "{vendor}" не поддерживается, планы выводятся без проверки'
+            ))
+
+        failures = []
+        with transaction.atomic():
+            if vendor == 'postgresql':
+                # На маленьких таблицах PostgreSQL всегда выбирает Seq Scan,
+                # поэтому проверяем, что индекс вообще применим
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset in hot_queries():
+                plan = queryset.explain()
+                full_scans = pattern.findall(plan) if pattern else []
+
+                if full_scans:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'✗ {name}: полный просмотр {", ".join(full_scans)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'✓ {name}'))
+
+                if options['verbosity'] > 1 or full_scans:
+                    for line in plan.splitlines():
+                        self.stdout.write(f'    {line}')
+
+        if failures:
+            raise CommandError(f'Запросы без индекса: {", ".join(failures)}')
@@ -1,138 +1,234 @@
-import os
-import django
-import re
-
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'paddle_booking.settings')
-django.setup()
+import time
+from collections import Counter
 
 from django.contrib.auth.models import User
-from users.models import UserProfile
-
-
-def normalize_phone(phone):
-    """Нормализует номер телефона для сравнения"""
-    if not phone:
-        return None
-
-    # Убираем все нецифровые символы
-    digits = re.sub(r'\D', '', str(phone))
-
-    if not digits:
-        return None
-
-    # Нормализуем российский номер
-    if digits.startswith('8'):
-        digits = '7' + digits[1:]
-    elif digits.startswith('9'):
-        digits = '7' + digits
-
-    if not digits.startswith('7'):
-        digits = '7' + digits
-
-    # Должно быть 11 цифр
-    if len(digits) != 11:
-        return None
-
-    return '+' + digits
-
-
-def clean_database():
-    print("=== ОЧИСТКА БАЗЫ ДАННЫХ ОТ ДУБЛИКАТОВ ===\n")
-
-    # 1. Удаляем тестовых пользователей (кроме admin)
-    test_users = User.objects.filter(username__startswith='KAMEHb')
-    print(f"Найдено тестовых пользователей: {test_users.count()}")
-
-    for user in test_users:
-        print(f"  Удаляю: {user.username}")
-        user.delete()
-
-    # 2. Находим дубликаты телефонов
-    print("\n=== ПОИСК ДУБЛИКАТОВ ТЕЛЕФОНОВ ===")
-
-    # Собираем все профили с телефонами
-    profiles = UserProfile.objects.exclude(phone__isnull=True).exclude(phone='')
-    print(f"Всего профилей с телефонами: {profiles.count()}")
-
-    # Группируем по нормализованным телефонам
-    phone_groups = {}
-    for profile in profiles:
-        normalized = normalize_phone(profile.phone)
-        if normalized:
-            if normalized not in phone_groups:
-                phone_groups[normalized] = []
-            phone_groups[normalized].append(profile)
-
-    # Находим дубликаты
-    duplicates = {phone: profiles for phone, profiles in phone_groups.items()
-                  if len(profiles) > 1}
-
-    print(f"Найдено дубликатов: {len(duplicates)}")
-
-    if duplicates:
-        print("\nИсправляю дубликаты...")
-        for phone, dup_profiles in duplicates.items():
-            print(f"\nТелефон: {phone}")
-            print(f"  Найден у {len(dup_profiles)} пользователей:")
-
-            # Оставляем телефон у первого пользователя (самого старого)
-            dup_profiles.sort(key=lambda p: p.created_at)
-            keep_profile = dup_profiles[0]
-
-            for i, profile in enumerate(dup_profiles):
-                if i == 0:
-                    print(f"  ✓ Оставляю у: {profile.user.username} (создан: {profile.created_at})")
-                else:
-                    print(f"  ✗ Удаляю у: {profile.user.username}")
-
-                    # Удаляем пользователя полностью
-                    profile.user.delete()
-
-    # 3. Создаем профили для пользователей без профилей
-    print("\n=== СОЗДАНИЕ ПРОФИЛЕЙ ===")
-    users_without_profiles = []
-    for user in User.objects.all():
-        try:
-            user.profile
-        except UserProfile.DoesNotExist:
-            users_without_profiles.append(user)
-
-    if users_without_profiles:
-        print(f"Пользователей без профилей: {len(users_without_profiles)}")
-        for user in users_without_profiles:
-            # Создаем уникальный временный телефон
-            import time
-            timestamp = int(time.time() * 1000) % 100000000
-            temp_phone = f'+7980{timestamp:08d}'[:12]  # Ограничиваем длину
-
-            UserProfile.objects.create(
-                user=user,
-                phone=temp_phone
-            )
-            print(f"  Создан профиль для: {user.username} (телефон: {temp_phone})")
-    else:
-        print("Все пользователи имеют профили")
-
-    # 4. Итоговая проверка
-    print("\n=== ИТОГ ===")
-    print(f"Всего пользователей: {User.objects.count()}")
-    print(f"Всего профилей: {UserProfile.objects.count()}")
-
-    # Проверяем уникальность телефонов
-    all_phones = []
-    for profile in UserProfile.objects.all():
-        if profile.phone:
-            all_phones.append(profile.phone)
-
-    unique_phones = set(all_phones)
-    print(f"Уникальных телефонов: {len(unique_phones)}")
-    print(f"Всего телефонов в базе: {len(all_phones)}")
-
-    if len(unique_phones) != len(all_phones):
-        print("ВНИМАНИЕ: Есть дубликаты телефонов!")
-    else:
-        print("✓ Все телефоны уникальны")
-
-
-if __name__ == "__main__":
-    clean_database()
\ No newline at end of file
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from users.models import UserProfile, normalize_phone, provision_users
+
+
+class Command(BaseCommand):
+    help = 'Очищает базу от тестовых пользователей и дубликатов телефонов (потоково, пакетами)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено и создано'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за один раз'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько пользователей удалять в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.chunk_size = options['chunk_size']
+        self.batch_size = options['batch_size']
+        self.processed = 0
+        started = time.monotonic()
+
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING('Пробный запуск: изменения не сохраняются'))
+
+        self.stdout.write('=== ОЧИСТКА БАЗЫ ДАННЫХ ОТ ДУБЛИКАТОВ ===')
+
+        # 1. Удаляем тестовых пользователей (кроме admin)
+        test_users = User.objects.filter(username__startswith='KAMEHb').values_list('id', flat=True)
+        deleted = self.delete_users(list(test_users), 'тестовых')
+        self.stdout.write(f'Тестовых пользователей: {deleted}')
+
+        # 2. Дубликаты телефонов
+        self.stdout.write('\n=== ПОИСК ДУБЛИКАТОВ ТЕЛЕФОНОВ ===')
+        self.fill_phone_normalized()
+        deleted = self.delete_duplicates()
+        self.stdout.write(f'Удалено пользователей-дубликатов: {deleted}')
+
+        # 3. Профили для пользователей без профилей
+        self.stdout.write('\n=== СОЗДАНИЕ ПРОФИЛЕЙ ===')
+        self.create_missing_profiles()
+
+        # 4. Итоговая проверка
+        self.report_totals()
+
+        elapsed = time.monotonic() - started
+        rate = self.processed / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'\nОбработано строк: {self.processed} за {elapsed:.1f} с ({rate:.0f} строк/с)'
+        ))
+
+    def progress(self, label, count):
+        self.stdout.write(f'  {label}: {count}')
+
+    def delete_users(self, user_ids, label):
+        """
+        Удалить пользователей пакетами, каждый пакет - своя транзакция.
+        user_ids собираются до удаления: SQLite не изолирует открытый курсор
+        от изменений той же таблицы в этом же соединении.
+        """
+        deleted = 0
+        batch = []
+
+        for user_id in user_ids:
+            batch.append(user_id)
+            if len(batch) >= self.batch_size:
+                deleted += self.delete_batch(batch)
+                self.progress(f'удалено {label}', deleted)
+                batch = []
+
+        if batch:
+            deleted += self.delete_batch(batch)
+        return deleted
+
+    def delete_batch(self, user_ids):
+        self.processed += len(user_ids)
+        if not self.dry_run:
+            with transaction.atomic():
+                User.objects.filter(id__in=user_ids).delete()
+        return len(user_ids)
+
+    def fill_phone_normalized(self):
+        """Досчитать нормализованный номер там, где его нет (строки, записанные мимо save)"""
+        profiles = UserProfile.objects.filter(
+            phone_normalized__isnull=True
+        ).exclude(phone='').only('id', 'phone')
+
+        # Пробный запуск ничего не пишет: номера запоминаются здесь (id -> номер),
+        # чтобы поиск дубликатов видел их так же, как настоящий запуск
+        self.normalized = {}
+        batch = []
+        filled = 0
+        for profile in profiles.iterator(chunk_size=self.chunk_size):
+            self.processed += 1
+            profile.phone_normalized = normalize_phone(profile.phone)
+            if profile.phone_normalized:
+                batch.append(profile)
+
+            if len(batch) >= self.batch_size:
+                filled += self.save_normalized(batch)
+                batch = []
+
+        if batch:
+            filled += self.save_normalized(batch)
+        if filled:
+            self.progress('дозаполнено нормализованных номеров', filled)
+
+    def save_normalized(self, profiles):
+        if self.dry_run:
+            self.normalized.update((profile.id, profile.phone_normalized) for profile in profiles)
+        else:
+            UserProfile.objects.bulk_update(profiles, ['phone_normalized'])
+        return len(profiles)
+
+    def delete_duplicates(self):
+        """
+        Оставить телефон самому старому профилю, остальных пользователей удалить.
+        Группы ищет база (GROUP BY), Python видит только строки дубликатов.
+        """
+        duplicate_phones = UserProfile.objects.exclude(
+            phone_normalized__isnull=True
+        ).values('phone_normalized').annotate(
+            profiles_count=Count('id')
+        ).filter(profiles_count__gt=1).values('phone_normalized')
+
+        profiles = UserProfile.objects.select_related('user').only(
+            'id', 'phone_normalized', 'created_at', 'user__id', 'user__username'
+        )
+
+        if self.normalized:
+            profiles = self.dry_run_duplicates(profiles, duplicate_phones)
+        else:
+            profiles = profiles.filter(
+                phone_normalized__in=duplicate_phones
+            ).order_by('phone_normalized', 'created_at', 'id').iterator(chunk_size=self.chunk_size)
+
+        def duplicate_user_ids():
+            current_phone = None
+            for profile in profiles:
+                if profile.phone_normalized != current_phone:
+                    current_phone = profile.phone_normalized
+                    self.stdout.write(f'\nТелефон: {current_phone}')
+                    self.stdout.write(f'  ✓ Оставляю у: {profile.user.username} (создан: {profile.created_at})')
+                    continue
+
+                self.stdout.write(f'  ✗ Удаляю у: {profile.user.username}')
+                yield profile.user_id
+
+        return self.delete_users(list(duplicate_user_ids()), 'дубликатов')
+
+    def dry_run_duplicates(self, profiles, duplicate_phones):
+        """
+        Дубликаты для пробного запуска: к группам из базы добавляются номера,
+        досчитанные в памяти. Строки дубликатов сортируются в Python.
+        """
+        phones = set(duplicate_phones.values_list('phone_normalized', flat=True))
+
+        # Сколько раз номер из памяти встречается среди уже заполненных в базе
+        counts = Counter(self.normalized.values())
+        candidates = list(counts)
+        for start in range(0, len(candidates), self.batch_size):
+            chunk = candidates[start:start + self.batch_size]
+            for phone, count in UserProfile.objects.filter(
+                phone_normalized__in=chunk
+            ).values('phone_normalized').annotate(
+                profiles_count=Count('id')
+            ).values_list('phone_normalized', 'profiles_count'):
+                counts[phone] += count
+        phones.update(phone for phone, count in counts.items() if count > 1)
+
+        rows = []
+        phone_list = list(phones)
+        for start in range(0, len(phone_list), self.batch_size):
+            rows.extend(profiles.filter(phone_normalized__in=phone_list[start:start + self.batch_size]))
+
+        profile_ids = [profile_id for profile_id, phone in self.normalized.items() if phone in phones]
+        for start in range(0, len(profile_ids), self.batch_size):
+            for profile in profiles.filter(id__in=profile_ids[start:start + self.batch_size]):
+                profile.phone_normalized = self.normalized[profile.id]
+                rows.append(profile)
+
+        rows.sort(key=lambda profile: (profile.phone_normalized, profile.created_at, profile.id))
+        return rows
+
+    def create_missing_profiles(self):
+        if self.dry_run:
+            missing = User.objects.filter(profile__isnull=True).count()
+            self.stdout.write(f'Пользователей без профилей: {missing}')
+            return
+
+        created, ratings = provision_users(batch_size=self.batch_size)
+        self.processed += created + ratings
+        if created:
+            self.stdout.write(f'Создано профилей с временными номерами: {created}')
+        else:
+            self.stdout.write('Все пользователи имеют профили')
+        if ratings:
+            self.stdout.write(f'Создано рейтингов по умолчанию: {ratings}')
+
+    def report_totals(self):
+        self.stdout.write('\n=== ИТОГ ===')
+        self.stdout.write(f'Всего пользователей: {User.objects.count()}')
+
+        totals = UserProfile.objects.exclude(phone='').aggregate(
+            profiles=Count('id'),
+            phones=Count('phone_normalized'),
+            unique_phones=Count('phone_normalized', distinct=True)
+        )
+        self.stdout.write(f'Всего профилей: {totals["profiles"]}')
+        self.stdout.write(f'Уникальных телефонов: {totals["unique_phones"]}')
+        self.stdout.write(f'Всего телефонов в базе: {totals["phones"]}')
+
+        if totals['unique_phones'] != totals['phones']:
+            self.stdout.write(self.style.WARNING('ВНИМАНИЕ: Есть дубликаты телефонов!'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ Все телефоны уникальны'))
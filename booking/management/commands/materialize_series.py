@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from booking.models import BookingSeries, SERIES_MATERIALIZE_DAYS
+
+
+class Command(BaseCommand):
+    help = 'Создает бронирования для ближайших занятий регулярных серий (запускать по расписанию)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=SERIES_MATERIALIZE_DAYS,
+            help='На сколько дней вперед создавать бронирования'
+        )
+
+    def handle(self, *args, **options):
+        created = BookingSeries.objects.materialize_due(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Создано бронирований: {created}'))
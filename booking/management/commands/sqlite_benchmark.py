@@ -0,0 +1,207 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, time as clock_time, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, OperationalError, close_old_connections, transaction
+
+from booking.models import ACTIVE_STATUSES, Booking, Court, CourtOccupancy, WORKING_HOURS_END, WORKING_HOURS_START
+
+# Профили сравнения: значение SQLITE_TUNING
+PROFILES = (('по умолчанию', '0'), ('рабочий', '1'))
+
+BENCHMARK_COURTS = 4
+BENCHMARK_USERS = 50
+BENCHMARK_DAYS = 365
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест SQLite: параллельные процессы читают занятость кортов '
+        'и создают бронирования; сравнивает настройки по умолчанию и рабочий режим'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Количество процессов')
+        parser.add_argument('--duration', type=float, default=5.0, help='Длительность каждого прогона (секунды)')
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Доля операций записи (создание бронирования)'
+        )
+        # Служебные параметры процессов нагрузки
+        parser.add_argument('--seed', action='store_true', help='Заполнить базу тестовыми данными')
+        parser.add_argument('--worker', action='store_true', help='Процесс нагрузки')
+        parser.add_argument('--start-at', type=float, default=0.0, help='Время начала нагрузки (epoch)')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed()
+        elif options['worker']:
+            self.run_worker(options)
+        else:
+            self.run_benchmark(options)
+
+    # ========== КООРДИНАТОР ==========
+
+    def run_benchmark(self, options):
+        if settings.DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Тест предназначен для SQLite')
+
+        results = []
+        for label, tuning in PROFILES:
+            self.stdout.write(f'Прогон "{label}": {options["workers"]} процессов, {options["duration"]} с...')
+            with tempfile.TemporaryDirectory() as directory:
+                env = dict(
+                    os.environ,
+                    SQLITE_PATH=os.path.join(directory, 'benchmark.sqlite3'),
+                    SQLITE_TUNING=tuning,
+                    # Кэш приложения в памяти процесса: сравниваем только базу
+                    CACHE_BACKEND='locmem',
+                    LOG_LEVEL='WARNING',
+                )
+                self.manage(env, 'migrate', '--verbosity', '0')
+                self.manage(env, 'sqlite_benchmark', '--seed')
+                results.append((label, self.run_workers(env, options)))
+
+        self.report(results, options['duration'])
+
+    def manage(self, env, *args):
+        result = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), *args],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise CommandError(f'manage.py {" ".join(args)} завершился с ошибкой:\n{result.stderr}')
+        return result.stdout
+
+    def run_workers(self, env, options):
+        # Процессы стартуют одновременно, после загрузки Django
+        start_at = time.time() + 2.0
+        processes = [
+            subprocess.Popen(
+                [
+                    sys.executable, str(settings.BASE_DIR / 'manage.py'), 'sqlite_benchmark', '--worker',
+                    '--duration', str(options['duration']),
+                    '--write-ratio', str(options['write_ratio']),
+                    '--start-at', str(start_at),
+                ],
+                cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+            )
+            for _ in range(options['workers'])
+        ]
+
+        totals = {'reads': [], 'writes': [], 'conflicts': 0, 'locked': 0}
+        for process in processes:
+            stdout, stderr = process.communicate()
+            if process.returncode != 0:
+                raise CommandError(f'Процесс нагрузки завершился с ошибкой:\n{stderr}')
+            stats = json.loads(stdout.strip().splitlines()[-1])
+            totals['reads'].extend(stats['reads'])
+            totals['writes'].extend(stats['writes'])
+            totals['conflicts'] += stats['conflicts']
+            totals['locked'] += stats['locked']
+        return totals
+
+    def report(self, results, duration):
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"Режим":<14}{"чтений/с":>10}{"записей/с":>11}{"p95 чтения":>12}'
+            f'{"p95 записи":>12}{"конфликтов":>12}{"locked":>8}'
+        )
+        for label, totals in results:
+            self.stdout.write(
+                f'{label:<14}'
+                f'{len(totals["reads"]) / duration:>10.0f}'
+                f'{len(totals["writes"]) / duration:>11.0f}'
+                f'{percentile(totals["reads"], 0.95):>10.1f}мс'
+                f'{percentile(totals["writes"], 0.95):>10.1f}мс'
+                f'{totals["conflicts"]:>12}'
+                f'{totals["locked"]:>8}'
+            )
+        self.stdout.write(
+            'Конфликты - занятые часы (IntegrityError), это нормальный исход записи. '
+            'locked - ошибки "database is locked".'
+        )
+
+    # ========== ПРОЦЕССЫ НАГРУЗКИ ==========
+
+    def seed(self):
+        Court.objects.bulk_create([
+            Court(name=f'Корт {number}', price_per_hour=1000) for number in range(1, BENCHMARK_COURTS + 1)
+        ])
+        User.objects.bulk_create([
+            User(username=f'benchmark{number}') for number in range(BENCHMARK_USERS)
+        ])
+
+    def run_worker(self, options):
+        court_ids = list(Court.objects.values_list('id', flat=True))
+        user_ids = list(User.objects.values_list('id', flat=True))
+        first_day = date.today() + timedelta(days=1)
+        close_old_connections()
+
+        delay = options['start_at'] - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        deadline = time.time() + options['duration']
+
+        stats = {'reads': [], 'writes': [], 'conflicts': 0, 'locked': 0}
+        while time.time() < deadline:
+            court_id = random.choice(court_ids)
+            day = first_day + timedelta(days=random.randrange(BENCHMARK_DAYS))
+            write = random.random() < options['write_ratio']
+
+            started = time.perf_counter()
+            try:
+                if write:
+                    self.write_booking(court_id, day, random.choice(user_ids))
+                else:
+                    self.read_day(court_id, day)
+            except IntegrityError:
+                stats['conflicts'] += 1
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                stats['locked'] += 1
+                continue
+            finally:
+                # Как в конце запроса: при CONN_MAX_AGE=0 соединение закрывается
+                close_old_connections()
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stats['writes' if write else 'reads'].append(round(elapsed_ms, 3))
+
+        self.stdout.write(json.dumps(stats))
+
+    def read_day(self, court_id, day):
+        """Чтение как в get_available_slots и карточках бронирований"""
+        CourtOccupancy.objects.get_mask(court_id, day)
+        list(Booking.objects.filter(
+            court_id=court_id, date=day, status__in=ACTIVE_STATUSES
+        ).values_list('start_time', 'end_time'))
+
+    def write_booking(self, court_id, day, user_id):
+        """Запись как в create_booking: бронирование, часы корта и карта занятости"""
+        hour = random.randrange(WORKING_HOURS_START, WORKING_HOURS_END)
+        with transaction.atomic():
+            Booking.objects.create(
+                user_id=user_id,
+                court_id=court_id,
+                date=day,
+                start_time=clock_time(hour),
+                end_time=clock_time(hour + 1),
+                status='pending'
+            )
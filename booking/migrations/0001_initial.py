@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Court',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('today_bookings_count', models.IntegerField(default=0, verbose_name='Бронирований сегодня')),
+                ('description', models.TextField()),
+                ('price_per_hour', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('is_available', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(choices=[('pending', 'В ожидании'), ('confirmed', 'Подтверждено'), ('cancelled', 'Отменено')], default='pending', max_length=20)),
+                ('confirmed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='booking.court')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CourtOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('mask', models.IntegerField(default=0, verbose_name='Занятые часы')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='booking.court')),
+            ],
+            options={
+                'verbose_name': 'Занятость корта',
+                'verbose_name_plural': 'Занятость кортов',
+                'constraints': [models.UniqueConstraint(fields=('court', 'date'), name='unique_court_occupancy_day')],
+            },
+        ),
+    ]
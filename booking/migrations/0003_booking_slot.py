@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def claim_existing_bookings(apps, schema_editor):
+    """Занять часы для уже существующих активных бронирований"""
+    Booking = apps.get_model('booking', 'Booking')
+    BookingSlot = apps.get_model('booking', 'BookingSlot')
+
+    bookings = Booking.objects.filter(
+        status__in=['pending', 'confirmed']
+    ).order_by('created_at').values_list('id', 'court_id', 'date', 'start_time', 'end_time')
+
+    slots = [
+        BookingSlot(booking_id=booking_id, court_id=court_id, date=date, hour=hour)
+        for booking_id, court_id, date, start_time, end_time in bookings.iterator()
+        for hour in range(start_time.hour, end_time.hour)
+    ]
+    # Ранее допущенные пересечения остаются за более ранним бронированием
+    BookingSlot.objects.bulk_create(slots, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0002_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='booking.booking')),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='booking.court')),
+            ],
+            options={
+                'verbose_name': 'Занятый час корта',
+                'verbose_name_plural': 'Занятые часы кортов',
+                'constraints': [models.UniqueConstraint(fields=('court', 'date', 'hour'), name='unique_booking_slot')],
+            },
+        ),
+        migrations.RunPython(claim_existing_bookings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+from django.db.models import F
+
+
+def claim_partial_hours(apps, schema_editor):
+    """
+    Занять час окончания бронирований, которые заканчиваются не ровно в начале часа
+    (10:30-11:30 занимает и 11:00), и добавить его в уже построенные карты занятости
+    """
+    Booking = apps.get_model('booking', 'Booking')
+    BookingSeries = apps.get_model('booking', 'BookingSeries')
+    BookingSlot = apps.get_model('booking', 'BookingSlot')
+    CourtOccupancy = apps.get_model('booking', 'CourtOccupancy')
+
+    bookings = Booking.objects.filter(
+        status__in=['pending', 'confirmed']
+    ).order_by('created_at').values_list('id', 'court_id', 'date', 'end_time')
+
+    slots = [
+        BookingSlot(booking_id=booking_id, court_id=court_id, date=date, hour=end_time.hour)
+        for booking_id, court_id, date, end_time in bookings.iterator()
+        if (end_time.minute, end_time.second) != (0, 0)
+    ]
+    # Час, уже занятый другим бронированием, остается за ним
+    BookingSlot.objects.bulk_create(slots, batch_size=500, ignore_conflicts=True)
+
+    # Старые карты отличаются от новых только часом окончания таких бронирований
+    # и серий: добавляем его битом, не пересчитывая карты
+    end_bits = {}
+    for _, court_id, date, end_time in bookings.iterator():
+        if (end_time.minute, end_time.second) != (0, 0):
+            end_bits[(court_id, date)] = end_bits.get((court_id, date), 0) | (1 << end_time.hour)
+    for (court_id, date), bits in end_bits.items():
+        CourtOccupancy.objects.filter(court_id=court_id, date=date).update(mask=F('mask').bitor(bits))
+
+    for series in BookingSeries.objects.filter(is_active=True).exclude(end_time__minute=0, end_time__second=0):
+        # Созданные занятия серии уже учтены выше как бронирования
+        days = CourtOccupancy.objects.filter(
+            court_id=series.court_id,
+            date__range=(series.start_date, series.end_date),
+            date__iso_week_day=series.weekday + 1
+        )
+        if series.materialized_until:
+            days = days.filter(date__gt=series.materialized_until)
+        days.update(mask=F('mask').bitor(1 << series.end_time.hour))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_booking_series'),
+    ]
+
+    operations = [
+        migrations.RunPython(claim_partial_hours, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,99 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Least
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from datetime import datetime, timedelta
 
+from paddle_booking import caching
+
+
+# Рабочие часы клуба: 8:00 - 22:00
+WORKING_HOURS_START = 8
+WORKING_HOURS_END = 22
+
+# Статусы, при которых бронирование занимает корт
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+# За сколько дней до занятия регулярной серии создается бронирование
+SERIES_MATERIALIZE_DAYS = getattr(settings, 'SERIES_MATERIALIZE_DAYS', 2)
+
+
+def hours_mask(start_hour, end_hour):
+    """Битовая маска часов [start_hour, end_hour): бит N - час N:00-N+1:00"""
+    if end_hour <= start_hour:
+        return 0
+    return ((1 << (end_hour - start_hour)) - 1) << start_hour
+
+
+def time_mask(start_time, end_time):
+    """
+    Маска часов, которые задевает интервал [start_time, end_time):
+    от начала часа начала до конца часа окончания (10:30-11:30 занимает 10 и 11)
+    """
+    end_hour = end_time.hour
+    if (end_time.minute, end_time.second, end_time.microsecond) != (0, 0, 0):
+        end_hour += 1
+    return hours_mask(start_time.hour, end_hour)
+
+
+def mask_hours(mask):
+    """Часы, отмеченные в маске"""
+    return [hour for hour in range(24) if mask & (1 << hour)]
+
+
+# Подтвердить бронирование можно не раньше чем за сутки до начала
+CONFIRMATION_WINDOW = timedelta(hours=24)
+
+
+def upcoming_q(today, current_time):
+    """Условие на предстоящие (еще не начавшиеся) бронирования"""
+    return Q(date__gt=today) | Q(date=today, start_time__gte=current_time)
+
+
+def annotate_time_flags(bookings, now=None):
+    """
+    Флаги времени для списка бронирований за один проход.
+    Текущее время переводится в локальное один раз, дальше сравниваются
+    naive datetime без make_aware на каждую строку.
+
+    Каждому бронированию проставляются атрибуты can_confirm_attr,
+    hours_until_confirmation_attr, is_past, can_cancel и today.
+    Возвращает список словарей booking_data для шаблона карточки.
+    """
+    local_now = timezone.localtime(now).replace(tzinfo=None)
+    today = local_now.date()
+    zero = timedelta(0)
+
+    result = []
+    for booking in bookings:
+        time_diff = datetime.combine(booking.date, booking.start_time) - local_now
+
+        booking.today = today
+        booking.can_confirm_attr = zero < time_diff <= CONFIRMATION_WINDOW
+        if time_diff > CONFIRMATION_WINDOW:
+            booking.hours_until_confirmation_attr = int(
+                (time_diff - CONFIRMATION_WINDOW).total_seconds() // 3600
+            )
+        else:
+            booking.hours_until_confirmation_attr = 0
+        booking.is_past = time_diff < zero
+        booking.can_cancel = not booking.is_past and booking.status in ACTIVE_STATUSES
+
+        result.append({
+            'booking': booking,
+            'can_confirm': booking.can_confirm_attr,
+            'hours_until_confirmation': booking.hours_until_confirmation_attr,
+            'is_past': booking.is_past,
+            'can_cancel': booking.can_cancel,
+            'today': today
+        })
+    return result
+
 
 class Court(models.Model):
     name = models.CharField(max_length=100)
@@ -15,6 +106,93 @@ class Court(models.Model):
         return self.name
 
 
+class BookingManager(models.Manager):
+    def bulk_create_claimed(self, bookings):
+        """
+        Вставить бронирования одной транзакцией вместе с занятыми часами.
+        Занятость всех затронутых дней (бронирования и серии) читается одним
+        представлением уже внутри транзакции; бронирования, пересекающиеся с ней
+        или с предыдущими в пакете, не сохраняются и остаются без pk.
+        Возвращает список сохраненных бронирований. Если часы заняли между
+        проверкой и вставкой, BookingSlot выбрасывает IntegrityError и не сохраняется ничего.
+        Бронирования серий сюда не передаются - их создает Booking.save.
+        """
+        states = [booking._occupancy_state() for booking in bookings]
+        active = [state for state in states if state]
+
+        with transaction.atomic():
+            masks = {}
+            if active:
+                dates = [date for _, date, _ in active]
+                masks = CourtOccupancy.objects.masks_for_range(
+                    {court_id for court_id, _, _ in active}, min(dates), max(dates)
+                )
+
+            accepted = []
+            for booking, state in zip(bookings, states):
+                if state:
+                    court_id, date, mask = state
+                    if masks.get((court_id, date), 0) & mask:
+                        continue
+                    masks[(court_id, date)] = masks.get((court_id, date), 0) | mask
+                accepted.append(booking)
+            if not accepted:
+                return []
+
+            created = self.bulk_create(accepted)
+
+            slots = []
+            days = set()
+            for booking in created:
+                state = booking._occupancy_state()
+                booking._loaded_occupancy = state
+                if state:
+                    court_id, date, mask = state
+                    days.add((court_id, date))
+                    slots.extend(
+                        BookingSlot(booking=booking, court_id=court_id, date=date, hour=hour)
+                        for hour in mask_hours(mask)
+                    )
+            BookingSlot.objects.bulk_create(slots)
+
+            # Маски дней уже посчитаны по представлению - одна вставка с обновлением
+            CourtOccupancy.objects.save_masks({day: masks[day] for day in days})
+            for court_id, date in days:
+                invalidate_slots_on_commit(court_id, date)
+
+            for user_id in {booking.user_id for booking in created}:
+                invalidate_user_stats_on_commit(user_id)
+        return created
+
+    def stats_for_user(self, user):
+        """
+        Счетчики бронирований пользователя одним запросом с условной агрегацией.
+        Результат кэшируется до конца текущего часа (от него зависит 'upcoming')
+        и сбрасывается при любом изменении бронирований пользователя.
+        """
+        now = timezone.localtime()
+        hour_key = now.strftime('%Y-%m-%d %H')
+        key = user_stats_key(user.pk)
+
+        cached = cache.get(key)
+        if cached and cached['hour'] == hour_key:
+            return cached['stats']
+
+        today = now.date()
+        current_time = now.time()
+        stats = self.filter(user=user).aggregate(
+            total=Count('id'),
+            confirmed=Count('id', filter=Q(status='confirmed')),
+            pending=Count('id', filter=Q(status='pending')),
+            cancelled=Count('id', filter=Q(status='cancelled')),
+            upcoming=Count('id', filter=upcoming_q(today, current_time) & Q(status__in=ACTIVE_STATUSES)),
+        )
+
+        seconds_left = 3600 - now.minute * 60 - now.second
+        cache.set(key, {'hour': hour_key, 'stats': stats}, max(1, seconds_left))
+        return stats
+
+
 class Booking(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     court = models.ForeignKey(Court, on_delete=models.CASCADE)
@@ -28,10 +206,79 @@ class Booking(models.Model):
         ('cancelled', 'Отменено'),
     ], default='pending')
     confirmed_at = models.DateTimeField(null=True, blank=True)
+    series = models.ForeignKey(
+        'BookingSeries',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bookings',
+        verbose_name='Регулярная серия'
+    )
+
+    objects = BookingManager()
+
+    class Meta:
+        indexes = [
+            # Занятость корта на дату: слоты, проверка пересечений, карта занятости
+            models.Index(fields=['court', 'date', 'status'], name='booking_court_date_status_idx'),
+            # Бронирования пользователя в профиле (сортировка по дате и времени)
+            models.Index(fields=['user', 'date', 'start_time'], name='booking_user_date_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.court.name} - {self.date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем, какие часы занимало бронирование при загрузке
+        instance._loaded_occupancy = instance._occupancy_state()
+        return instance
+
+    def _occupancy_state(self):
+        """(корт, дата, маска часов) или None, если бронирование не занимает корт"""
+        fields = self.__dict__
+        if fields.get('status') not in ACTIVE_STATUSES:
+            return None
+        start_time, end_time = fields.get('start_time'), fields.get('end_time')
+        if fields.get('court_id') is None or start_time is None or end_time is None:
+            return None
+        return fields['court_id'], fields.get('date'), time_mask(start_time, end_time)
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняем, занимая часы корта в BookingSlot, и обновляем карту занятости.
+        Если часы уже заняты другим бронированием, база отклоняет вставку
+        и save выбрасывает IntegrityError, ничего не сохранив.
+        """
+        old_state = getattr(self, '_loaded_occupancy', None)
+        new_state = self._occupancy_state()
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            invalidate_user_stats_on_commit(self.user_id)
+
+            if old_state != new_state:
+                self._claim_slots(new_state)
+                days = {state[:2] for state in (old_state, new_state) if state}
+                for court_id, date in days:
+                    CourtOccupancy.objects.rebuild(court_id, date)
+                    invalidate_slots_on_commit(court_id, date)
+        self._loaded_occupancy = new_state
+
+    def _claim_slots(self, state):
+        """Заменить занятые бронированием часы корта на часы из state"""
+        BookingSlot.objects.filter(booking=self).delete()
+        if state:
+            court_id, date, mask = state
+            # Часы регулярных серий не занимают BookingSlot до создания занятия
+            if BookingSeries.objects.mask_for(court_id, date, exclude_id=self.series_id) & mask:
+                raise IntegrityError('Время занято регулярным бронированием')
+            BookingSlot.objects.bulk_create([
+                BookingSlot(booking=self, court_id=court_id, date=date, hour=hour)
+                for hour in mask_hours(mask)
+            ])
+
     @property
     def total_price(self):
         """Рассчитывает общую стоимость бронирования"""
@@ -90,4 +337,369 @@ class Booking(models.Model):
             self.confirmed_at = timezone.now()
             self.save()
             return True
-        return False
\ No newline at end of file
+        return False
+
+
+class BookingSlot(models.Model):
+    """
+    Час корта, занятый активным бронированием.
+    Уникальность (корт, дата, час) не дает базе сохранить пересекающиеся бронирования.
+    """
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='slots')
+    court = models.ForeignKey(Court, on_delete=models.CASCADE)
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name = 'Занятый час корта'
+        verbose_name_plural = 'Занятые часы кортов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['court', 'date', 'hour'],
+                name='unique_booking_slot'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.court_id} - {self.date} {self.hour:02d}:00"
+
+
+class CourtOccupancyManager(models.Manager):
+    def get_mask(self, court_id, date):
+        """Маска занятых часов корта на дату (один запрос по ключу)"""
+        mask = self.filter(court_id=court_id, date=date).values_list('mask', flat=True).first()
+        if mask is None:
+            # Дня без записи: считаем по бронированиям, не записывая - чтение
+            # слотов не должно брать блокировку записи. Записи создает rebuild
+            # при изменении бронирований
+            mask = self.compute_mask(court_id, date)
+        return mask
+
+    def rebuild(self, court_id, date):
+        """Пересчитать и сохранить маску дня по активным бронированиям"""
+        mask = self.compute_mask(court_id, date)
+        self.update_or_create(court_id=court_id, date=date, defaults={'mask': mask})
+        return mask
+
+    def rebuild_days(self, court_id, dates):
+        """
+        Пересчитать и сохранить маски нескольких дней корта: одно чтение
+        бронирований и серий за период и одна вставка с обновлением
+        """
+        dates = sorted(set(dates))
+        if not dates:
+            return
+        masks = self.masks_for_range([court_id], dates[0], dates[-1])
+        self.save_masks({(court_id, date): masks.get((court_id, date), 0) for date in dates})
+
+    def save_masks(self, masks):
+        """Записать маски {(court_id, date): mask} одной вставкой с обновлением"""
+        self.bulk_create(
+            [CourtOccupancy(court_id=court_id, date=date, mask=mask) for (court_id, date), mask in masks.items()],
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['court', 'date'],
+            update_fields=['mask', 'updated_at']
+        )
+
+    def compute_mask(self, court_id, date):
+        """Маска дня по активным бронированиям и сериям"""
+        mask = 0
+        bookings = Booking.objects.filter(
+            court_id=court_id,
+            date=date,
+            status__in=ACTIVE_STATUSES
+        ).values_list('start_time', 'end_time')
+
+        for start_time, end_time in bookings:
+            mask |= time_mask(start_time, end_time)
+        mask |= BookingSeries.objects.mask_for(court_id, date)
+        return mask
+
+    def masks_for_range(self, court_ids, start_date, end_date):
+        """
+        Маски занятости для нескольких кортов и дней одним запросом к бронированиям.
+        Возвращает {(court_id, date): mask}; свободные дни в словарь не попадают.
+        """
+        masks = {}
+        bookings = Booking.objects.filter(
+            court_id__in=court_ids,
+            date__range=(start_date, end_date),
+            status__in=ACTIVE_STATUSES
+        ).values_list('court_id', 'date', 'start_time', 'end_time')
+
+        for court_id, date, start_time, end_time in bookings:
+            key = (court_id, date)
+            masks[key] = masks.get(key, 0) | time_mask(start_time, end_time)
+
+        for key, mask in BookingSeries.objects.masks_for_range(court_ids, start_date, end_date).items():
+            masks[key] = masks.get(key, 0) | mask
+        return masks
+
+
+class CourtOccupancy(models.Model):
+    """Карта занятости корта на день: бит N установлен, если час N:00 занят"""
+    court = models.ForeignKey(Court, on_delete=models.CASCADE, related_name='occupancy')
+    date = models.DateField()
+    mask = models.IntegerField(default=0, verbose_name='Занятые часы')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CourtOccupancyManager()
+
+    class Meta:
+        verbose_name = 'Занятость корта'
+        verbose_name_plural = 'Занятость кортов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['court', 'date'],
+                name='unique_court_occupancy_day'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.court_id} - {self.date}: {self.mask:024b}"
+
+    def is_hour_free(self, hour):
+        return not self.mask & (1 << hour)
+
+
+class BookingSeriesManager(models.Manager):
+    def active_between(self, court_ids, start_date, end_date):
+        """Действующие серии кортов, пересекающиеся с периодом"""
+        return self.filter(
+            court_id__in=court_ids,
+            is_active=True,
+            start_date__lte=end_date,
+            end_date__gte=start_date
+        )
+
+    def mask_for(self, court_id, date, exclude_id=None):
+        """Часы корта на дату, занятые еще не созданными занятиями серий"""
+        series_list = self.active_between([court_id], date, date).filter(weekday=date.weekday())
+        if exclude_id:
+            series_list = series_list.exclude(id=exclude_id)
+
+        mask = 0
+        for series in series_list:
+            if series.is_pending_on(date):
+                mask |= series.mask
+        return mask
+
+    def masks_for_range(self, court_ids, start_date, end_date):
+        """{(court_id, date): mask} по еще не созданным занятиям серий за период"""
+        masks = {}
+        for series in self.active_between(court_ids, start_date, end_date):
+            for date in series.pending_dates(start_date, end_date):
+                key = (series.court_id, date)
+                masks[key] = masks.get(key, 0) | series.mask
+        return masks
+
+    def find_conflict(self, court_id, weekday, start_date, end_date, mask):
+        """Первая дата периода, в которую часы mask уже заняты, иначе None"""
+        conflicts = []
+
+        bookings = Booking.objects.filter(
+            court_id=court_id,
+            date__range=(start_date, end_date),
+            date__iso_week_day=weekday + 1,
+            status__in=ACTIVE_STATUSES
+        ).values_list('date', 'start_time', 'end_time')
+        for date, start_time, end_time in bookings:
+            if time_mask(start_time, end_time) & mask:
+                conflicts.append(date)
+
+        series_list = self.active_between([court_id], start_date, end_date).filter(weekday=weekday)
+        for series in series_list:
+            if series.mask & mask:
+                dates = list(series.pending_dates(start_date, end_date))
+                conflicts.extend(dates[:1])
+
+        return min(conflicts) if conflicts else None
+
+    def materialize_due(self, days=SERIES_MATERIALIZE_DAYS):
+        """Создать бронирования для занятий всех серий на ближайшие days дней"""
+        today = timezone.now().date()
+        until = today + timedelta(days=days)
+        # Серия уже созданная до until или до своего конца пропускается
+        due = self.filter(
+            is_active=True, start_date__lte=until, end_date__gte=today
+        ).exclude(
+            materialized_until__gte=Least(Value(until, output_field=models.DateField()), F('end_date'))
+        )
+        created = 0
+        for series in due:
+            created += series.materialize(until)
+        return created
+
+
+class BookingSeries(models.Model):
+    """
+    Регулярное бронирование: один корт в одно время раз в неделю.
+    Занятия не хранятся построчно - бронирование создается только
+    за SERIES_MATERIALIZE_DAYS дней до занятия.
+    """
+    WEEKDAYS = [
+        (0, 'Понедельник'),
+        (1, 'Вторник'),
+        (2, 'Среда'),
+        (3, 'Четверг'),
+        (4, 'Пятница'),
+        (5, 'Суббота'),
+        (6, 'Воскресенье'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_series')
+    court = models.ForeignKey(Court, on_delete=models.CASCADE, related_name='booking_series')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAYS, verbose_name='День недели')
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    start_date = models.DateField(verbose_name='Первое занятие')
+    end_date = models.DateField(verbose_name='Последнее занятие')
+    is_active = models.BooleanField(default=True)
+    # Для дат до этой включительно занятия уже созданы как Booking
+    materialized_until = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = BookingSeriesManager()
+
+    class Meta:
+        verbose_name = 'Регулярное бронирование'
+        verbose_name_plural = 'Регулярные бронирования'
+        indexes = [
+            models.Index(fields=['court', 'weekday', 'is_active'], name='series_court_weekday_idx'),
+        ]
+
+    def __str__(self):
+        return (f"{self.user.username} - {self.court.name} - {self.get_weekday_display()} "
+                f"{self.start_time.strftime('%H:%M')}")
+
+    @property
+    def mask(self):
+        return time_mask(self.start_time, self.end_time)
+
+    def is_pending_on(self, date):
+        """Есть ли на дату занятие, для которого еще не создано бронирование"""
+        return (
+            self.start_date <= date <= self.end_date
+            and date.weekday() == self.weekday
+            and (self.materialized_until is None or date > self.materialized_until)
+        )
+
+    def pending_dates(self, start_date, end_date):
+        """Даты занятий в периоде, для которых еще не созданы бронирования"""
+        first = max(start_date, self.start_date)
+        if self.materialized_until:
+            first = max(first, self.materialized_until + timedelta(days=1))
+        last = min(end_date, self.end_date)
+
+        day = first + timedelta(days=(self.weekday - first.weekday()) % 7)
+        while day <= last:
+            yield day
+            day += timedelta(days=7)
+
+    def save(self, *args, **kwargs):
+        """Сохраняем и пересчитываем карты занятости дней серии"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) == {'materialized_until'}:
+            # materialize: часы созданных занятий уже заняты их бронированиями,
+            # карты этих дней пересобрал Booking.save
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Карты занятости дней серии пересчитываются сразу: чтение слотов их не пишет
+            first = self.start_date + timedelta(days=(self.weekday - self.start_date.weekday()) % 7)
+            CourtOccupancy.objects.rebuild_days(
+                self.court_id,
+                (first + timedelta(days=7 * week) for week in range((self.end_date - first).days // 7 + 1))
+            )
+
+        court_id = self.court_id
+        transaction.on_commit(lambda: invalidate_court_slots(court_id))
+
+    def materialize(self, until):
+        """Создать бронирования для занятий по дату until включительно"""
+        created = 0
+        # Прошедшие занятия, не созданные вовремя, не восстанавливаем
+        for date in self.pending_dates(timezone.now().date(), until):
+            try:
+                Booking.objects.create(
+                    user=self.user,
+                    court=self.court,
+                    date=date,
+                    start_time=self.start_time,
+                    end_time=self.end_time,
+                    series=self,
+                    status='pending'
+                )
+                created += 1
+            except IntegrityError:
+                # Занятие уже создано ранее или время занято - пропускаем
+                pass
+
+        self.materialized_until = min(until, self.end_date)
+        self.save(update_fields=['materialized_until'])
+        return created
+
+
+@receiver(post_delete, sender=Booking)
+def release_court_occupancy(sender, instance, origin=None, **kwargs):
+    """Освободить часы корта при удалении бронирования"""
+    invalidate_user_stats_on_commit(instance.user_id)
+
+    # При удалении корта его карты занятости удаляются вместе с ним
+    if isinstance(origin, Court) or getattr(origin, 'model', None) is Court:
+        return
+
+    state = getattr(instance, '_loaded_occupancy', None) or instance._occupancy_state()
+    if state:
+        CourtOccupancy.objects.rebuild(state[0], state[1])
+        invalidate_slots_on_commit(state[0], state[1])
+
+
+def invalidate_slots_on_commit(court_id, date):
+    """Сбросить кэш слотов дня корта после фиксации транзакции"""
+    from .slots_cache import bump_version
+
+    date_str = date.strftime('%Y-%m-%d')
+    transaction.on_commit(lambda: bump_version(court_id, date_str))
+
+
+def user_stats_key(user_id):
+    return caching.make_key('booking_stats', user_id)
+
+
+def invalidate_user_stats_on_commit(user_id):
+    """Сбросить кэш статистики бронирований пользователя после фиксации транзакции"""
+    caching.delete_on_commit(user_stats_key(user_id))
+
+
+def invalidate_court_slots(court_id):
+    from .slots_cache import invalidate_court
+
+    invalidate_court(court_id)
+
+
+COURTS_VERSION_KEY = caching.make_key('courts', 'version')
+
+
+def get_courts_version():
+    """Версия списка кортов для кэша фрагмента на странице бронирования"""
+    return caching.get_version(COURTS_VERSION_KEY)
+
+
+def invalidate_courts_on_commit():
+    """Сбросить закэшированный список кортов после фиксации транзакции"""
+    caching.bump_version_on_commit(COURTS_VERSION_KEY)
+
+
+@receiver(post_save, sender=Court)
+@receiver(post_delete, sender=Court)
+def refresh_courts(sender, instance, raw=False, **kwargs):
+    """Изменение корта в админке или коде меняет список на странице бронирования"""
+    if not raw:
+        invalidate_courts_on_commit()
+        # Цена и доступность корта входят в ответы слотов
+        court_id = instance.pk
+        transaction.on_commit(lambda: invalidate_court_slots(court_id))
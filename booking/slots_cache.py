@@ -0,0 +1,115 @@
+"""
+Кэш ответов get_available_slots.
+
+Ключ ответа содержит три счетчика: общее поколение, поколение корта
+и версию дня корта. Бронирование меняет версию дня, изменение корта -
+поколение корта (все его даты сразу), invalidate_all - общее поколение.
+Старые записи не удаляются, а просто перестают читаться.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from paddle_booking import caching
+
+# Время жизни ответа для будущих дат (секунды)
+SLOTS_CACHE_TTL = getattr(settings, 'SLOTS_CACHE_TTL', 300)
+
+GENERATION_KEY = caching.make_key('slots', 'generation')
+
+
+# Попадания и промахи считаются в памяти процесса: чтение из кэша
+# не должно писать в общий ключ на каждый запрос
+_counters = {'hits': 0, 'misses': 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def version_key(court_id, date_str):
+    return caching.make_key('slots', 'version', court_id, date_str)
+
+
+def get_version(court_id, date_str):
+    """Текущая версия дня корта"""
+    return caching.get_version(version_key(court_id, date_str))
+
+
+def bump_version(court_id, date_str):
+    """Сделать недействительными все закэшированные ответы дня корта"""
+    caching.bump_version(version_key(court_id, date_str))
+
+
+def court_generation_key(court_id):
+    return caching.make_key('slots', 'generation', court_id)
+
+
+def invalidate_court(court_id):
+    """Сбросить ответы корта на все даты одной сменой поколения корта"""
+    caching.bump_version(court_generation_key(court_id))
+
+
+def invalidate_all():
+    """Сбросить ответы всех кортов"""
+    caching.bump_version(GENERATION_KEY)
+
+
+def _payload_key(court_id, date_str, booking_date):
+    generation, court_generation, version = caching.get_versions([
+        GENERATION_KEY, court_generation_key(court_id), version_key(court_id, date_str)
+    ])
+    parts = [court_id, date_str, f'g{generation}.{court_generation}', f'v{version}']
+    now = timezone.now()
+    if booking_date == now.date():
+        # Для сегодняшней даты ответ зависит от текущего часа
+        parts.append(f'h{now.hour}')
+    return caching.make_key('slots', *parts)
+
+
+def _payload_ttl(booking_date):
+    """Для сегодняшней даты ответ живет не дольше конца текущего часа"""
+    now = timezone.now()
+    if booking_date != now.date():
+        return SLOTS_CACHE_TTL
+    seconds_left = 3600 - now.minute * 60 - now.second
+    return max(1, min(SLOTS_CACHE_TTL, seconds_left))
+
+
+def get_or_build(court_id, booking_date, build):
+    """
+    Вернуть ответ для корта и даты из кэша или построить его через build().
+    Возвращает пару (payload, hit). build() может вернуть None - такой
+    ответ не кэшируется.
+    """
+    date_str = booking_date.strftime('%Y-%m-%d')
+    key = _payload_key(court_id, date_str, booking_date)
+
+    payload = cache.get(key)
+    if payload is not None:
+        _count('hits')
+        return payload, True
+
+    _count('misses')
+    payload = build()
+    if payload is not None:
+        cache.set(key, payload, _payload_ttl(booking_date))
+    return payload, False
+
+
+def get_stats():
+    """Счетчики попаданий и промахов кэша слотов в текущем процессе"""
+    with _counters_lock:
+        hits, misses = _counters['hits'], _counters['misses']
+    total = hits + misses
+    return {
+        'pid': os.getpid(),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else 0.0,
+    }
@@ -4,8 +4,14 @@ from . import views
 urlpatterns = [
     path('', views.booking_page, name='booking'),
     path('available-slots/', views.get_available_slots, name='available_slots'),
+    path('available-slots/stats/', views.slots_cache_stats, name='slots_cache_stats'),
+    path('availability-matrix/', views.get_availability_matrix, name='availability_matrix'),
     path('create/', views.create_booking, name='create_booking'),
+    path('create-batch/', views.create_bookings_batch, name='create_bookings_batch'),
     path('cancel/<int:booking_id>/', views.cancel_booking, name='cancel_booking'),
+    path('series/create/', views.create_booking_series, name='create_booking_series'),
+    path('series/cancel/<int:series_id>/', views.cancel_booking_series, name='cancel_booking_series'),
     path('confirm/<int:booking_id>/', views.confirm_booking, name='confirm_booking'),
     path('booking-info/<int:booking_id>/', views.get_booking_info, name='booking_info'),
+    path('history/', views.booking_history, name='booking_history'),
 ]
\ No newline at end of file
@@ -1,16 +1,21 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
+from django.template.loader import render_to_string
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST, require_GET
 from django.utils import timezone
 from django.contrib import messages
-from django.core.cache import cache
-from django.db import transaction
-from datetime import datetime, timedelta
+from django.db import transaction, IntegrityError
+from datetime import datetime, timedelta, time
 from django.urls import reverse
 from django.db.models import Q
-from .models import Court, Booking
-import traceback
+from . import slots_cache
+from .models import (
+    Court, Booking, BookingSeries, BookingSlot, CourtOccupancy,
+    WORKING_HOURS_START, WORKING_HOURS_END, SERIES_MATERIALIZE_DAYS, mask_hours, time_mask,
+    annotate_time_flags, get_courts_version, upcoming_q,
+)
+import json
 
 
 import logging
@@ -23,8 +28,10 @@ def booking_page(request):
     """Страница бронирования кортов"""
     courts = Court.objects.filter(is_available=True).order_by('name')
     today_date = timezone.now().date()
+    # Запрос кортов выполнится только при промахе кэша фрагмента
     return render(request, 'booking.html', {
         'courts': courts,
+        'courts_version': get_courts_version(),
         'today_date': today_date
     })
 
@@ -34,8 +41,7 @@ def get_available_slots(request):
     court_id = request.GET.get('court')
     date_str = request.GET.get('date')
 
-    print(f"🔍 DEBUG: get_available_slots called with court={court_id}, date={date_str}")
-    print(f"🔍 DEBUG: Current time: {timezone.now().time()}")
+    logger.debug("get_available_slots: court=%s date=%s", court_id, date_str)
 
     if not court_id or not date_str:
         return JsonResponse({
@@ -44,111 +50,153 @@ def get_available_slots(request):
         })
 
     try:
-        court = Court.objects.filter(id=court_id, is_available=True).first()
-        if not court:
-            print(f"❌ DEBUG: Court not found or not available: {court_id}")
-            return JsonResponse({
-                'success': False,
-                'message': 'Корт не найден или недоступен'
-            })
-
         booking_date = datetime.strptime(date_str, '%Y-%m-%d').date()
         today = timezone.now().date()
         current_time = timezone.now().time()
 
-        print(f"🔍 DEBUG: booking_date={booking_date}, today={today}")
-        print(f"🔍 DEBUG: current_time={current_time}")
-
         if booking_date < today:
-            print(f"❌ DEBUG: Booking date is in the past: {booking_date}")
             return JsonResponse({
                 'success': False,
                 'message': 'Нельзя бронировать корт на прошедшую дату'
             })
 
-        # Получаем существующие бронирования
-        existing_bookings = Booking.objects.filter(
-            court=court,
-            date=booking_date,
-            status__in=['pending', 'confirmed']
-        )
-
-        print(f"🔍 DEBUG: Found {existing_bookings.count()} existing bookings")
-
-        # Словарь занятых часов
-        booked_hours = {}
-        for booking in existing_bookings:
-            start_hour = booking.start_time.hour
-            end_hour = booking.end_time.hour
-            for hour in range(start_hour, end_hour):
-                booked_hours[hour] = True
-            print(f"🔍 DEBUG: Booking from {start_hour}:00 to {end_hour}:00")
+        def build_result():
+            court = Court.objects.filter(id=court_id, is_available=True).first()
+            if not court:
+                return None
 
-        # Рабочие часы: 8:00 - 22:00
-        WORKING_HOURS_START = 8
-        WORKING_HOURS_END = 22
+            # Занятые часы берем из карты занятости корта (без выборки бронирований)
+            occupied_mask = CourtOccupancy.objects.get_mask(court.id, booking_date)
 
-        all_slots = []
-
-        # Только если сегодняшняя дата
-        if booking_date == today:
-            current_hour = current_time.hour
-            print(f"🔍 DEBUG: Today! Current hour: {current_hour}")
-        else:
-            current_hour = -1  # Будущая дата, все часы доступны
-            print(f"🔍 DEBUG: Future date! All hours available")
-
-        for hour in range(WORKING_HOURS_START, WORKING_HOURS_END):
-            is_available = hour not in booked_hours
-
-            # Если сегодня, нельзя бронировать прошедшее время
-            if booking_date == today and hour < current_hour:
-                is_available = False
-                print(f"🔍 DEBUG: Hour {hour}:00 is in the past (current hour: {current_hour})")
-
-            all_slots.append({
-                'start_time': f"{hour:02d}:00",
-                'end_time': f"{(hour + 1):02d}:00",
-                'is_available': is_available,
-                'duration': 1,
-                'hour': hour
-            })
+            # Только если сегодняшняя дата
+            if booking_date == today:
+                current_hour = current_time.hour
+            else:
+                current_hour = -1  # Будущая дата, все часы доступны
 
-        # Подсчет статистики
-        available_count = sum(1 for slot in all_slots if slot['is_available'])
+            all_slots = build_day_slots(occupied_mask, current_hour)
 
-        print(f"🔍 DEBUG: Available slots: {available_count}/{len(all_slots)}")
-        print(f"🔍 DEBUG: Booked hours dict: {booked_hours}")
+            # Подсчет статистики
+            available_count = sum(1 for slot in all_slots if slot['is_available'])
 
-        result = {
-            'success': True,
-            'slots': all_slots,
-            'court_price': float(court.price_per_hour),
-            'court_name': court.name,
-            'court_id': court.id,
-            'date': date_str,
-            'date_formatted': booking_date.strftime('%d.%m.%Y'),
-            'available_count': available_count,
-            'total_slots': len(all_slots)
-        }
+            logger.debug(
+                "get_available_slots: court=%s date=%s mask=%s available=%d/%d",
+                court.id, booking_date, occupied_mask, available_count, len(all_slots)
+            )
 
-        print(f"✅ DEBUG: Returning JSON response with {len(all_slots)} slots")
-        print(f"✅ DEBUG: Slots availability: {[(s['start_time'], s['is_available']) for s in all_slots]}")
+            return {
+                'success': True,
+                'slots': all_slots,
+                'court_price': float(court.price_per_hour),
+                'court_name': court.name,
+                'court_id': court.id,
+                'date': booking_date.strftime('%Y-%m-%d'),
+                'date_formatted': booking_date.strftime('%d.%m.%Y'),
+                'available_count': available_count,
+                'total_slots': len(all_slots)
+            }
+
+        result, cache_hit = slots_cache.get_or_build(int(court_id), booking_date, build_result)
+        if result is None:
+            return JsonResponse({
+                'success': False,
+                'message': 'Корт не найден или недоступен'
+            })
 
         response = JsonResponse(result)
         response['Content-Type'] = 'application/json; charset=utf-8'
+        response['X-Slots-Cache'] = 'HIT' if cache_hit else 'MISS'
         return response
 
     except Exception as e:
-        print(f"🔥 ERROR in get_available_slots: {str(e)}")
-        print(f"🔥 ERROR traceback: {traceback.format_exc()}")
-
-        logger.error(f"Error in get_available_slots: {str(e)}", exc_info=True)
+        logger.error("Error in get_available_slots: %s", e, exc_info=True)
         return JsonResponse({
             'success': False,
             'message': 'Ошибка загрузки слотов'
         }, status=500)
 
+# Ограничения матрицы доступности
+MATRIX_MAX_DAYS = 31
+MATRIX_MAX_COURTS = 20
+
+
+@require_GET
+def get_availability_matrix(request):
+    """
+    Доступность нескольких кортов на несколько дней одним ответом.
+    Параметры: date (YYYY-MM-DD, по умолчанию сегодня), days (по умолчанию 7),
+    courts (id через запятую, по умолчанию все доступные корты).
+    """
+    try:
+        today = timezone.now().date()
+        current_time = timezone.now().time()
+
+        date_str = request.GET.get('date')
+        start_date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else today
+        days = int(request.GET.get('days', 7))
+
+        if start_date < today:
+            return JsonResponse({
+                'success': False,
+                'message': 'Нельзя бронировать корт на прошедшую дату'
+            })
+
+        if not 1 <= days <= MATRIX_MAX_DAYS:
+            return JsonResponse({
+                'success': False,
+                'message': f'Количество дней должно быть от 1 до {MATRIX_MAX_DAYS}'
+            })
+
+        courts = Court.objects.filter(is_available=True).order_by('name')
+        courts_param = request.GET.get('courts')
+        if courts_param:
+            court_ids = [int(court_id) for court_id in courts_param.split(',') if court_id.strip()]
+            courts = courts.filter(id__in=court_ids)
+        courts = list(courts[:MATRIX_MAX_COURTS])
+
+        dates = [start_date + timedelta(days=i) for i in range(days)]
+        masks = CourtOccupancy.objects.masks_for_range(
+            [court.id for court in courts], dates[0], dates[-1]
+        )
+
+        matrix = []
+        for court in courts:
+            court_days = {}
+            for day in dates:
+                current_hour = current_time.hour if day == today else -1
+                slots = build_day_slots(masks.get((court.id, day), 0), current_hour)
+                court_days[day.strftime('%Y-%m-%d')] = {
+                    'slots': slots,
+                    'available_count': sum(1 for slot in slots if slot['is_available']),
+                    'total_slots': len(slots)
+                }
+
+            matrix.append({
+                'court_id': court.id,
+                'court_name': court.name,
+                'court_price': float(court.price_per_hour),
+                'days': court_days
+            })
+
+        return JsonResponse({
+            'success': True,
+            'dates': [day.strftime('%Y-%m-%d') for day in dates],
+            'courts': matrix
+        })
+
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Неверные параметры запроса'
+        }, status=400)
+    except Exception as e:
+        logger.error("Error in get_availability_matrix: %s", e, exc_info=True)
+        return JsonResponse({
+            'success': False,
+            'message': 'Ошибка загрузки доступности'
+        }, status=500)
+
+
 @login_required
 @require_POST
 def create_booking(request):
@@ -318,40 +366,9 @@ def create_booking(request):
         # 5. УБРАН ЛИМИТ НА КОЛИЧЕСТВО СЛОТОВ В ДЕНЬ!
         # Пользователь может бронировать сколько угодно
 
-        # 6. Проверка пересечений с существующими бронированиями
-        with transaction.atomic():
-            existing_bookings = Booking.objects.select_for_update().filter(
-                court=court,
-                date=booking_date,
-                status__in=['pending', 'confirmed']
-            )
-
-            # Проверяем пересечение по времени
-            for booking in existing_bookings:
-                if (booking.start_time <= start_time < booking.end_time or
-                        booking.start_time < end_time <= booking.end_time or
-                        (start_time <= booking.start_time and end_time >= booking.end_time)):
-                    conflict_start = booking.start_time.strftime('%H:%M')
-                    conflict_end = booking.end_time.strftime('%H:%M')
-
-                    error_html = f'''
-                    <div style="display: flex; align-items: center; gap: 12px;">
-                        <i class="fas fa-exclamation-circle" style="font-size: 24px; color: white;"></i>
-                        <div>
-                            <div style="font-size: 16px; font-weight: bold; color: white; margin-bottom: 5px;">
-                                ❌ Время занято
-                            </div>
-                            <div style="font-size: 14px; color: rgba(255,255,255,0.9);">
-                                Выбранное время уже занято с {conflict_start} до {conflict_end}
-                            </div>
-                        </div>
-                    </div>
-                    '''
-
-                    messages.error(request, error_html)
-                    return redirect('booking')
-
-            # 7. Создаем бронирование
+        # 6-7. Создаем бронирование: пересечения отсекает уникальность
+        # занятых часов (BookingSlot) в базе, без предварительного чтения
+        try:
             booking = Booking.objects.create(
                 user=request.user,
                 court=court,
@@ -360,15 +377,44 @@ def create_booking(request):
                 end_time=end_time,
                 status='pending'
             )
+        except IntegrityError:
+            conflict = BookingSlot.objects.filter(
+                court=court,
+                date=booking_date,
+                hour__in=mask_hours(time_mask(start_time, end_time))
+            ).select_related('booking').first()
+
+            if conflict:
+                conflict_start = conflict.booking.start_time.strftime('%H:%M')
+                conflict_end = conflict.booking.end_time.strftime('%H:%M')
+                conflict_text = f'Выбранное время уже занято с {conflict_start} до {conflict_end}'
+            else:
+                conflict_text = 'Выбранное время уже занято'
+
+            error_html = f'''
+            <div style="display: flex; align-items: center; gap: 12px;">
+                <i class="fas fa-exclamation-circle" style="font-size: 24px; color: white;"></i>
+                <div>
+                    <div style="font-size: 16px; font-weight: bold; color: white; margin-bottom: 5px;">
+                        ❌ Время занято
+                    </div>
+                    <div style="font-size: 14px; color: rgba(255,255,255,0.9);">
+                        {conflict_text}
+                    </div>
+                </div>
+            </div>
+            '''
+
+            messages.error(request, error_html)
+            return redirect('booking')
 
-        # 8. Очищаем кэш слотов
-        clear_slots_cache(court_id=court_id, date_str=date_str)
+        # 8. Кэш слотов сбрасывается в Booking.save
 
         # 9. Логируем
         logger.info(
-            f"Booking created: User {request.user.username} booked court {court.name} "
-            f"on {booking_date} from {start_time_str} to {end_time.strftime('%H:%M')} "
-            f"(Duration: {duration_hours}h, Price: {booking.total_price} руб.)"
+            "Booking created: User %s booked court %s on %s from %s to %s (Duration: %sh, Price: %s руб.)",
+            request.user.username, court.name, booking_date, start_time_str,
+            end_time.strftime('%H:%M'), duration_hours, booking.total_price
         )
 
         # 10. КРАСИВОЕ HTML СООБЩЕНИЕ ДЛЯ УВЕДОМЛЕНИЯ
@@ -432,7 +478,7 @@ def create_booking(request):
     except Exception as e:
         # Логируем ошибку
         logger.error(
-            f"Error creating booking for user {request.user.username}: {str(e)}",
+            "Error creating booking for user %s: %s", request.user.username, e,
             exc_info=True,
             extra={'request': request}
         )
@@ -457,6 +503,258 @@ def create_booking(request):
         return redirect('booking')
 
 
+# Максимум бронирований в одном пакетном запросе
+BATCH_MAX_ITEMS = 50
+
+
+@login_required
+@require_POST
+def create_bookings_batch(request):
+    """
+    Пакетное создание бронирований (AJAX, JSON).
+    Тело: {"items": [{"court_id", "date", "start_time", "end_time"}, ...]}.
+    Все проходящие проверку бронирования сохраняются одной транзакцией,
+    для каждого элемента возвращается свой результат.
+    """
+    try:
+        items = json.loads(request.body).get('items')
+    except (ValueError, AttributeError):
+        items = None
+
+    if not isinstance(items, list) or not items:
+        return JsonResponse({
+            'success': False,
+            'message': 'Передайте список бронирований в поле items'
+        }, status=400)
+
+    if len(items) > BATCH_MAX_ITEMS:
+        return JsonResponse({
+            'success': False,
+            'message': f'Не более {BATCH_MAX_ITEMS} бронирований за один запрос'
+        }, status=400)
+
+    try:
+        now = timezone.now()
+        results = [None] * len(items)
+
+        def fail(index, message):
+            results[index] = {'index': index, 'success': False, 'message': message}
+
+        # 1. Разбор и проверка времени каждого элемента
+        parsed = []
+        for index, item in enumerate(items):
+            try:
+                court_id = int(item['court_id'])
+                booking_date = datetime.strptime(item['date'], '%Y-%m-%d').date()
+                start_time = datetime.strptime(item['start_time'], '%H:%M').time()
+                end_time = datetime.strptime(item['end_time'], '%H:%M').time()
+            except (KeyError, TypeError, ValueError):
+                fail(index, 'Неверные данные бронирования')
+                continue
+
+            error = booking_time_error(booking_date, start_time, end_time, now)
+            if error:
+                fail(index, error)
+                continue
+
+            parsed.append((index, court_id, booking_date, start_time, end_time))
+
+        # 2. Корты и занятость всех затронутых дней - по одному запросу
+        courts = Court.objects.filter(
+            id__in={court_id for _, court_id, _, _, _ in parsed},
+            is_available=True
+        ).in_bulk()
+
+        masks = {}
+        if parsed:
+            dates = [booking_date for _, _, booking_date, _, _ in parsed]
+            masks = CourtOccupancy.objects.masks_for_range(courts.keys(), min(dates), max(dates))
+
+        # 3. Проверка пересечений с существующими и соседними в пакете бронированиями
+        to_create = []
+        for index, court_id, booking_date, start_time, end_time in parsed:
+            court = courts.get(court_id)
+            if not court:
+                fail(index, 'Корт не найден или недоступен')
+                continue
+
+            requested = time_mask(start_time, end_time)
+            key = (court_id, booking_date)
+            if masks.get(key, 0) & requested:
+                fail(index, 'Выбранное время уже занято')
+                continue
+
+            masks[key] = masks.get(key, 0) | requested
+            to_create.append((index, Booking(
+                user=request.user,
+                court=court,
+                date=booking_date,
+                start_time=start_time,
+                end_time=end_time,
+                status='pending'
+            )))
+
+        # 4. Одна вставка для всех прошедших проверку бронирований. Элементы, чье
+        # время заняли параллельно, bulk_create_claimed пропускает (остаются без pk)
+        if to_create:
+            for attempt in range(2):
+                try:
+                    Booking.objects.bulk_create_claimed([booking for _, booking in to_create])
+                    break
+                except IntegrityError:
+                    # Часы заняли между проверкой и вставкой: транзакция откатена,
+                    # повторяем один раз по новой занятости
+                    for _, booking in to_create:
+                        booking.pk = None
+                        booking._state.adding = True
+
+        created = 0
+        for index, booking in to_create:
+            if booking.pk is None:
+                fail(index, 'Выбранное время уже занято')
+                continue
+            created += 1
+            results[index] = {
+                'index': index,
+                'success': True,
+                'booking_id': booking.id,
+                'price': booking.total_price
+            }
+
+        logger.info(
+            "Batch booking: user %s created %d of %d bookings",
+            request.user.username, created, len(items)
+        )
+
+        return JsonResponse({
+            'success': bool(created),
+            'created': created,
+            'results': results
+        })
+
+    except Exception as e:
+        logger.error(
+            "Error creating batch bookings for user %s: %s", request.user.username, e,
+            exc_info=True
+        )
+        return JsonResponse({
+            'success': False,
+            'message': 'Ошибка при создании бронирований'
+        }, status=500)
+
+
+# Максимальная длина регулярной серии в неделях
+SERIES_MAX_WEEKS = 26
+
+
+@login_required
+@require_POST
+def create_booking_series(request):
+    """
+    Создание регулярного бронирования (AJAX): один корт в одно время каждую неделю.
+    Поля: court_id, start_date, start_time, end_time, weeks.
+    """
+    try:
+        court = Court.objects.filter(id=request.POST.get('court_id'), is_available=True).first()
+        if not court:
+            return JsonResponse({
+                'success': False,
+                'message': 'Корт не найден или недоступен'
+            })
+
+        start_date = datetime.strptime(request.POST.get('start_date', ''), '%Y-%m-%d').date()
+        start_time = datetime.strptime(request.POST.get('start_time', ''), '%H:%M').time()
+        end_time = datetime.strptime(request.POST.get('end_time', ''), '%H:%M').time()
+        weeks = int(request.POST.get('weeks', 4))
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Все поля должны быть заполнены'
+        })
+
+    if not 1 <= weeks <= SERIES_MAX_WEEKS:
+        return JsonResponse({
+            'success': False,
+            'message': f'Серия может длиться от 1 до {SERIES_MAX_WEEKS} недель'
+        })
+
+    error = booking_time_error(start_date, start_time, end_time, timezone.now())
+    if error:
+        return JsonResponse({'success': False, 'message': error})
+
+    try:
+        end_date = start_date + timedelta(weeks=weeks - 1)
+        weekday = start_date.weekday()
+
+        with transaction.atomic():
+            conflict_date = BookingSeries.objects.find_conflict(
+                court.id, weekday, start_date, end_date,
+                time_mask(start_time, end_time)
+            )
+            if conflict_date:
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Выбранное время уже занято {conflict_date.strftime("%d.%m.%Y")}'
+                })
+
+            series = BookingSeries.objects.create(
+                user=request.user,
+                court=court,
+                weekday=weekday,
+                start_time=start_time,
+                end_time=end_time,
+                start_date=start_date,
+                end_date=end_date
+            )
+
+            # Ближайшие занятия сразу становятся обычными бронированиями
+            series.materialize(timezone.now().date() + timedelta(days=SERIES_MATERIALIZE_DAYS))
+
+        logger.info(
+            "Booking series created: user %s, court %s, %s %s, %d weeks",
+            request.user.username, court.name, series.get_weekday_display(),
+            start_time.strftime('%H:%M'), weeks
+        )
+
+        return JsonResponse({
+            'success': True,
+            'message': 'Регулярное бронирование создано',
+            'series_id': series.id,
+            'end_date': end_date.strftime('%d.%m.%Y')
+        })
+
+    except Exception as e:
+        logger.error("Error creating booking series: %s", e, exc_info=True)
+        return JsonResponse({
+            'success': False,
+            'message': 'Ошибка при создании регулярного бронирования'
+        }, status=500)
+
+
+@login_required
+@require_POST
+def cancel_booking_series(request, series_id):
+    """Отмена регулярного бронирования (уже созданные бронирования отменяются отдельно)"""
+    series = get_object_or_404(BookingSeries, id=series_id, user=request.user)
+
+    if not series.is_active:
+        return JsonResponse({
+            'success': False,
+            'message': 'Это регулярное бронирование уже отменено'
+        })
+
+    series.is_active = False
+    series.save()
+
+    logger.info("Booking series %s cancelled by user %s", series_id, request.user.username)
+
+    return JsonResponse({
+        'success': True,
+        'message': 'Регулярное бронирование отменено',
+        'series_id': series_id
+    })
+
+
 @login_required
 @require_POST
 def cancel_booking(request, booking_id):
@@ -487,18 +785,11 @@ def cancel_booking(request, booking_id):
                     'message': 'Нельзя отменить бронирование менее чем за 1 час до начала'
                 })
 
-        # Сохраняем данные для очистки кэша
-        court_id = booking.court.id
-        date_str = booking.date.strftime('%Y-%m-%d')
-
-        # Отменяем бронирование
+        # Отменяем бронирование (карта занятости и кэш слотов обновляются в save)
         booking.status = 'cancelled'
         booking.save()
 
-        # Очищаем кэш
-        clear_slots_cache(court_id=court_id, date_str=date_str)
-
-        logger.info(f"Booking {booking_id} cancelled by user {request.user.username}")
+        logger.info("Booking %s cancelled by user %s", booking_id, request.user.username)
 
         return JsonResponse({
             'success': True,
@@ -507,7 +798,7 @@ def cancel_booking(request, booking_id):
         })
 
     except Exception as e:
-        logger.error(f"Error cancelling booking {booking_id}: {str(e)}")
+        logger.error("Error cancelling booking %s: %s", booking_id, e)
         return JsonResponse({
             'success': False,
             'message': 'Ошибка при отмене бронирования'
@@ -591,22 +882,14 @@ def check_availability(request):
         end_hour = int(start_time_str.split(':')[0]) + hours
         end_time = datetime.strptime(f"{end_hour:02d}:00", '%H:%M').time()
 
-        # Проверяем существующие бронирования
-        existing_bookings = Booking.objects.filter(
-            court=court,
-            date=booking_date,
-            status__in=['pending', 'confirmed']
-        )
-
-        for booking in existing_bookings:
-            if (booking.start_time <= start_time < booking.end_time or
-                    booking.start_time < end_time <= booking.end_time or
-                    (start_time <= booking.start_time and end_time >= booking.end_time)):
-                return JsonResponse({
-                    'success': False,
-                    'available': False,
-                    'message': 'Выбранное время уже занято'
-                })
+        # Проверяем пересечение по карте занятости корта
+        occupied_mask = CourtOccupancy.objects.get_mask(court.id, booking_date)
+        if occupied_mask & time_mask(start_time, end_time):
+            return JsonResponse({
+                'success': False,
+                'available': False,
+                'message': 'Выбранное время уже занято'
+            })
 
         return JsonResponse({
             'success': True,
@@ -615,7 +898,7 @@ def check_availability(request):
         })
 
     except Exception as e:
-        logger.error(f"Error checking availability: {str(e)}")
+        logger.error("Error checking availability: %s", e)
         return JsonResponse({
             'success': False,
             'message': 'Ошибка при проверке доступности'
@@ -624,29 +907,60 @@ def check_availability(request):
 
 # ========== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ==========
 
-def clear_slots_cache(court_id=None, date_str=None):
-    """Очистка кэша слотов"""
-    try:
-        if court_id and date_str:
-            cache.delete(f'slots_{court_id}_{date_str}')
-            cache.delete(f'court_{court_id}')
+def booking_time_error(booking_date, start_time, end_time, now):
+    """Текст ошибки, если время бронирования недопустимо, иначе None"""
+    today = now.date()
 
-        elif court_id:
-            today = timezone.now().date()
-            keys_to_delete = []
+    if booking_date < today:
+        return 'Нельзя бронировать корт на прошедшую дату'
 
-            for i in range(90):
-                future_date = today + timedelta(days=i)
-                date_key = future_date.strftime('%Y-%m-%d')
-                keys_to_delete.append(f'slots_{court_id}_{date_key}')
+    if booking_date == today and start_time < now.time():
+        return 'Нельзя бронировать корт на прошедшее время сегодня'
 
-            for i in range(0, len(keys_to_delete), 100):
-                cache.delete_many(keys_to_delete[i:i + 100])
+    if end_time <= start_time:
+        return 'Время окончания должно быть позже времени начала'
 
-            cache.delete(f'court_{court_id}')
+    duration_hours = (
+        datetime.combine(booking_date, end_time) - datetime.combine(booking_date, start_time)
+    ).total_seconds() / 3600
 
-    except Exception as e:
-        logger.error(f"Error clearing cache: {str(e)}")
+    if duration_hours < 1:
+        return 'Минимальная продолжительность бронирования - 1 час'
+
+    if duration_hours > 3:
+        return 'Максимальная продолжительность бронирования - 3 часа'
+
+    if start_time < time(WORKING_HOURS_START) or end_time > time(WORKING_HOURS_END):
+        return f'Бронирование доступно только с {WORKING_HOURS_START:02d}:00 до {WORKING_HOURS_END:02d}:00'
+
+    return None
+
+
+def build_day_slots(occupied_mask, current_hour=-1):
+    """
+    Часовые слоты рабочего дня по маске занятости.
+    Часы раньше current_hour (для сегодняшней даты) недоступны.
+    """
+    slots = []
+    for hour in range(WORKING_HOURS_START, WORKING_HOURS_END):
+        slots.append({
+            'start_time': f"{hour:02d}:00",
+            'end_time': f"{(hour + 1):02d}:00",
+            'is_available': hour >= current_hour and not occupied_mask & (1 << hour),
+            'duration': 1,
+            'hour': hour
+        })
+    return slots
+
+
+@user_passes_test(lambda u: u.is_staff)
+@require_GET
+def slots_cache_stats(request):
+    """Статистика кэша слотов (для персонала)"""
+    return JsonResponse({
+        'success': True,
+        'stats': slots_cache.get_stats()
+    })
 
 
 # ========== ПРОФИЛЬ ПОЛЬЗОВАТЕЛЯ ==========
@@ -663,61 +977,24 @@ def profile(request):
     except User.DoesNotExist:
         user = request.user
 
-    # Получаем бронирования с оптимизацией запросов
-    bookings = Booking.objects.filter(
+    now = timezone.localtime()
+    today = now.date()
+
+    # Только предстоящие бронирования, история - через booking_history
+    bookings = list(Booking.objects.filter(
+        upcoming_q(today, now.time()),
         user=request.user
     ).select_related(
         'court'
     ).order_by(
-        '-date', '-start_time'
-    )
-
-    today = timezone.now().date()
-    current_time = timezone.now().time()
+        '-date', '-start_time', '-id'
+    ))
 
-    # Обрабатываем каждое бронирование
-    for booking in bookings:
-        booking.today = today
-
-        # Рассчитываем полную дату начала бронирования
-        booking_datetime = timezone.make_aware(
-            datetime.combine(booking.date, booking.start_time)
-        )
-
-        # Можно ли подтвердить? (за 24 часа до начала)
-        time_diff = booking_datetime - timezone.now()
-        booking.can_confirm_attr = timedelta(hours=0) < time_diff <= timedelta(hours=24)
-
-        # Сколько часов осталось до возможности подтверждения
-        if time_diff > timedelta(hours=24):
-            hours_until = (time_diff - timedelta(hours=24)).total_seconds() / 3600
-            booking.hours_until_confirmation_attr = max(0, int(hours_until))
-        else:
-            booking.hours_until_confirmation_attr = 0
-
-        # Прошедшее ли бронирование?
-        booking.is_past = booking.date < today or (
-                booking.date == today and booking.start_time < current_time
-        )
-
-        # Можно ли отменить? (не прошедшее и не отмененное)
-        booking.can_cancel = (
-                not booking.is_past and
-                booking.status in ['pending', 'confirmed']
-        )
+    # Флаги подтверждения и отмены для всех карточек сразу
+    annotate_time_flags(bookings, now)
 
     # Статистика для пользователя
-    booking_stats = {
-        'total': bookings.count(),
-        'confirmed': bookings.filter(status='confirmed').count(),
-        'pending': bookings.filter(status='pending').count(),
-        'cancelled': bookings.filter(status='cancelled').count(),
-        'upcoming': bookings.filter(
-            Q(date__gt=today) |
-            Q(date=today, start_time__gt=current_time),
-            status__in=['pending', 'confirmed']
-        ).count(),
-    }
+    booking_stats = Booking.objects.stats_for_user(request.user)
 
     # Получаем активную вкладку из GET-параметра или session
     active_tab = request.GET.get('tab', 'bookings')
@@ -725,6 +1002,7 @@ def profile(request):
     context = {
         'user': user,
         'bookings': bookings,
+        'has_history': booking_stats['total'] > len(bookings),
         'today': today,
         'booking_stats': booking_stats,
         'active_tab': active_tab,
@@ -733,18 +1011,86 @@ def profile(request):
     return render(request, 'users/profile.html', context)
 
 
+# Размер порции истории бронирований
+HISTORY_PAGE_SIZE = 20
+
+
+@login_required
+@require_GET
+def booking_history(request):
+    """
+    Прошедшие бронирования пользователя порциями (AJAX).
+    Keyset-пагинация по (date, start_time, id): курсор - ключ последней
+    показанной карточки, поэтому цена порции не зависит от глубины истории.
+    """
+    now = timezone.localtime()
+    today = now.date()
+
+    bookings = Booking.objects.filter(
+        user=request.user
+    ).exclude(
+        upcoming_q(today, now.time())
+    ).select_related(
+        'court'
+    ).order_by(
+        '-date', '-start_time', '-id'
+    )
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            cursor_date, cursor_time, cursor_id = cursor.split('_')
+            cursor_date = datetime.strptime(cursor_date, '%Y-%m-%d').date()
+            cursor_time = time.fromisoformat(cursor_time)
+            cursor_id = int(cursor_id)
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'message': 'Неверный курсор'
+            }, status=400)
+
+        bookings = bookings.filter(
+            Q(date__lt=cursor_date) |
+            Q(date=cursor_date, start_time__lt=cursor_time) |
+            Q(date=cursor_date, start_time=cursor_time, id__lt=cursor_id)
+        )
+
+    page = list(bookings[:HISTORY_PAGE_SIZE + 1])
+    has_more = len(page) > HISTORY_PAGE_SIZE
+    page = page[:HISTORY_PAGE_SIZE]
+
+    html = ''.join(
+        render_to_string('partials/booking_card.html', {
+            'booking_data': booking_data
+        }, request=request)
+        for booking_data in annotate_time_flags(page, now)
+    )
+
+    next_cursor = None
+    if has_more:
+        last = page[-1]
+        next_cursor = f"{last.date.strftime('%Y-%m-%d')}_{last.start_time.isoformat()}_{last.id}"
+
+    return JsonResponse({
+        'success': True,
+        'html': html,
+        'count': len(page),
+        'has_more': has_more,
+        'next_cursor': next_cursor
+    })
+
+
 # ========== ДОПОЛНИТЕЛЬНЫЕ VIEW ==========
 
 
 
 def my_bookings(request):
     """Показать все бронирования пользователя (для совместимости)"""
-    bookings = Booking.objects.filter(user=request.user).order_by('-date', '-start_time')
-    today = timezone.now().date()
+    bookings = list(Booking.objects.filter(
+        user=request.user
+    ).select_related('court').order_by('-date', '-start_time'))
+    now = timezone.localtime()
 
-    for booking in bookings:
-        booking.today = today
-        booking.can_confirm_attr = booking.can_confirm
-        booking.hours_until_confirmation_attr = booking.hours_until_confirmation
+    annotate_time_flags(bookings, now)
 
-    return render(request, 'users/bookings.html', {'bookings': bookings, 'today': today})
\ No newline at end of file
+    return render(request, 'users/bookings.html', {'bookings': bookings, 'today': now.date()})
\ No newline at end of file
@@ -0,0 +1,55 @@
+"""
+Общие помощники кэша.
+
+Ключи собираются из пространства имен и частей (make_key). Версии наборов
+ключей хранятся в самом кэше: сброс в одном процессе виден всем процессам,
+подключенным к тому же кэшу (файловый, база, Redis, Memcached). Префикс
+KEY_PREFIX и версию VERSION из settings.CACHES к ключам добавляет Django.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def make_key(namespace, *parts):
+    """Ключ вида 'namespace:часть:часть'"""
+    return ':'.join([namespace, *(str(part) for part in parts)])
+
+
+def get_version(key):
+    """Текущая версия набора ключей"""
+    version = cache.get(key)
+    if version is None:
+        # Начинаем с метки времени, а не с 1: если ключ версии вытеснен
+        # из кэша, старые записи не совпадут с новой версией
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def get_versions(keys):
+    """Версии нескольких наборов ключей за одно обращение к кэшу"""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = get_version(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(key):
+    """Сделать недействительными все записи, построенные на версии key"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_version_on_commit(key):
+    """Сменить версию после фиксации транзакции"""
+    transaction.on_commit(lambda: bump_version(key))
+
+
+def delete_on_commit(*keys):
+    """Удалить ключи после фиксации транзакции"""
+    transaction.on_commit(lambda: cache.delete_many(keys))
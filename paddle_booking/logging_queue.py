@@ -0,0 +1,46 @@
+"""
+Неблокирующее логирование для settings.LOGGING.
+
+Поток запроса только кладет запись в очередь; запись в консоль и файлы
+выполняет фоновый QueueListener. В Python 3.11 dictConfig не умеет
+настраивать QueueListener сам, поэтому слушатель создает этот обработчик.
+"""
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class QueueListenerHandler(logging.Handler):
+    """
+    Обработчик-обертка над QueueHandler со своим QueueListener.
+    handlers - ссылки 'cfg://handlers.<имя>' на уже настроенные обработчики:
+    dictConfig настраивает обработчики по алфавиту, поэтому имя этого
+    обработчика должно идти после их имен.
+
+    Класс не наследует QueueHandler: начиная с Python 3.12 dictConfig
+    настраивает наследников QueueHandler по-своему и не принимает
+    такой параметр handlers.
+    """
+
+    def __init__(self, handlers, respect_handler_level=True):
+        super().__init__()
+        self.queue = queue.SimpleQueue()
+        self.queue_handler = QueueHandler(self.queue)
+        # Элементы ConvertingList разрешаются в обработчики при обращении
+        handlers = [handlers[i] for i in range(len(handlers))]
+        self.listener = QueueListener(
+            self.queue, *handlers, respect_handler_level=respect_handler_level
+        )
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def emit(self, record):
+        self.queue_handler.emit(record)
+
+    def close(self):
+        # При перенастройке логирования дописываем очередь и останавливаем поток
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.queue_handler.close()
+        super().close()
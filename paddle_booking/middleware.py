@@ -0,0 +1,97 @@
+"""
+Профилирование запросов: число SQL-запросов, их суммарное время,
+повторяющиеся запросы (признак N+1) и общее время ответа.
+
+Включается настройкой QUERY_PROFILER_ENABLED (переменная окружения
+QUERY_PROFILER=1). Результат пишется в лог paddle_booking.profiler и
+в заголовок Server-Timing, который видно в DevTools браузера.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('paddle_booking.profiler')
+
+# Сколько одинаковых запросов за ответ считаются N+1
+DUPLICATE_THRESHOLD = getattr(settings, 'QUERY_PROFILER_DUPLICATE_THRESHOLD', 3)
+
+# Ответы дольше этого порога пишутся с уровнем WARNING (миллисекунды)
+SLOW_REQUEST_MS = getattr(settings, 'QUERY_PROFILER_SLOW_MS', 500)
+
+
+class QueryRecorder:
+    """Обертка выполнения SQL: считает запросы и их время"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            # Текст запроса без параметров: одинаковый для всех итераций цикла
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= DUPLICATE_THRESHOLD]
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        wall_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.duration * 1000
+        duplicates = recorder.duplicates()
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else request.path
+
+        level = logging.WARNING if wall_ms >= SLOW_REQUEST_MS or duplicates else logging.INFO
+        logger.log(
+            level,
+            'view=%s method=%s status=%s queries=%d db_ms=%.1f wall_ms=%.1f duplicates=%d',
+            view, request.method, response.status_code, recorder.count, db_ms, wall_ms, len(duplicates),
+            extra={
+                'view': view,
+                'queries': recorder.count,
+                'db_ms': round(db_ms, 1),
+                'wall_ms': round(wall_ms, 1),
+                'duplicates': len(duplicates),
+            }
+        )
+        for sql, count in duplicates:
+            logger.warning('view=%s repeated=%d sql=%s', view, count, sql[:300])
+
+        timings = [
+            f'db;dur={db_ms:.1f};desc="{recorder.count} queries"',
+            f'app;dur={wall_ms - db_ms:.1f}',
+            f'total;dur={wall_ms:.1f}',
+        ]
+        if duplicates:
+            timings.append(f'dup;desc="{len(duplicates)} repeated"')
+        existing = response.get('Server-Timing')
+        response['Server-Timing'] = ', '.join(([existing] if existing else []) + timings)
+
+        return response
@@ -21,6 +21,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'paddle_booking.middleware.QueryProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -30,6 +31,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Профилирование запросов (число SQL, время, N+1) в лог и Server-Timing
+QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER') == '1'
+
 ROOT_URLCONF = 'paddle_booking.urls'
 
 TEMPLATES = [
@@ -43,6 +47,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'users.context_processors.navbar',
             ],
         },
     },
@@ -53,10 +58,67 @@ WSGI_APPLICATION = 'paddle_booking.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH') or BASE_DIR / 'db.sqlite3',
     }
 }
 
+# Рабочий режим SQLite (SQLITE_TUNING=0 - настройки SQLite по умолчанию):
+#   WAL                  - читатели не ждут писателя и наоборот
+#   synchronous=NORMAL   - без fsync на каждый коммит; в WAL база не портится при сбое
+#   mmap_size/cache_size - чтение страниц из памяти (128 МБ mmap, 64 МБ кэша страниц)
+#   busy_timeout         - ждать блокировку до 20 с вместо ошибки "database is locked"
+#   IMMEDIATE            - транзакция сразу берет блокировку записи; отложенная
+#                          транзакция при переходе к записи падает без ожидания
+#   CONN_MAX_AGE         - соединение и его PRAGMA живут между запросами
+# Проверка под нагрузкой: manage.py sqlite_benchmark
+SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '1') == '1'
+if SQLITE_TUNING:
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA cache_size=-65536;'
+                'PRAGMA busy_timeout=20000;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+        },
+    })
+
+# Кэш, общий для всех процессов сервера (CACHE_BACKEND):
+#   file      - файлы в CACHE_LOCATION, один хост (по умолчанию)
+#   db        - таблица в основной базе, нужен manage.py createcachetable
+#   redis     - Redis (пакет redis), memcached - Memcached (пакет pymemcache)
+#   locmem    - память процесса, только для сервера в одном процессе:
+#               сброс кэша слотов не виден другим процессам
+# Проверка: manage.py cache_check. CACHE_VERSION сбрасывает весь кэш разом
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+CACHE_BACKENDS = {
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'django_cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'paddle_booking'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION') or CACHE_BACKENDS[CACHE_BACKEND][1],
+        'KEY_PREFIX': 'paddle_booking',
+        'VERSION': int(os.environ.get('CACHE_VERSION', '1')),
+    }
+}
+# Эти бэкенды сами вытесняют записи сверх MAX_ENTRIES (по умолчанию 300).
+# Файловый кэш при каждой записи перечисляет все файлы каталога,
+# поэтому записей в нем должно быть немного
+CACHE_MAX_ENTRIES = {'locmem': 10000, 'db': 10000, 'file': 500}
+if CACHE_BACKEND in CACHE_MAX_ENTRIES:
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': CACHE_MAX_ENTRIES[CACHE_BACKEND]}
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -73,6 +135,13 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic минифицирует CSS/JS, добавляет хэш в имена и кладет сжатые
+# копии .gz/.br; при DEBUG = False нужен собранный манифест (collectstatic)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'paddle_booking.storage.CompressedManifestStaticFilesStorage'},
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -82,6 +151,9 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 AVATAR_UPLOAD_DIR = 'avatars/'
 
+# Уровень логов приложений; DEBUG включает подробный вывод (LOG_LEVEL=DEBUG)
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
 # ✅ ИСПРАВЛЕННОЕ ЛОГИРОВАНИЕ
 LOGGING = {
     'version': 1,
@@ -98,7 +170,7 @@ LOGGING = {
     },
     'handlers': {
         'console': {
-            'level': 'INFO',
+            'level': 'DEBUG',
             'class': 'logging.StreamHandler',
             'formatter': 'simple'
         },
@@ -116,21 +188,36 @@ LOGGING = {
             'formatter': 'verbose',
             'encoding': 'utf-8',
         },
+        # Поток запроса только ставит запись в очередь, вывод - в фоновом потоке.
+        # Имя должно идти по алфавиту после обработчиков, на которые ссылается
+        'queue': {
+            'class': 'paddle_booking.logging_queue.QueueListenerHandler',
+            'handlers': [
+                'cfg://handlers.console',
+                'cfg://handlers.file',
+                'cfg://handlers.error_file',
+            ],
+        },
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': True,
         },
         'booking': {  # Логи для приложения booking
-            'handlers': ['console', 'file', 'error_file'],
-            'level': 'INFO',
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
             'propagate': False,
         },
         'users': {  # Логи для приложения users
-            'handlers': ['console', 'file', 'error_file'],
-            'level': 'INFO',
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        'paddle_booking': {  # Проект: страницы и профилирование запросов
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
             'propagate': False,
         },
     },
@@ -140,6 +227,5 @@ LOGGING = {
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
-    print(f"✅ Создана папка для логов: {LOG_DIR}")
 
 CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
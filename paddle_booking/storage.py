@@ -0,0 +1,108 @@
+"""
+Хранилище статики для collectstatic.
+
+CSS и JS при записи в STATIC_ROOT минифицируются, а
+ManifestStaticFilesStorage дает им имена с хэшем исходного содержимого
+(style.3f2a9c1b7e4d.css). Рядом с каждым файлом с хэшем кладутся
+сжатые копии .gz и .br (brotli - если установлен пакет brotli),
+которые view static отдает браузерам, поддерживающим сжатие.
+"""
+import gzip
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Текстовые файлы, которые имеет смысл сжимать
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.json', '.html')
+
+# Файлы меньше этого размера не сжимаются: выигрыш меньше заголовков
+MIN_COMPRESS_SIZE = 256
+
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+CSS_SPACE_RE = re.compile(r'\s+')
+CSS_PUNCTUATION_RE = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(text):
+    """Удаление комментариев и лишних пробелов"""
+    text = CSS_COMMENT_RE.sub('', text)
+    text = CSS_SPACE_RE.sub(' ', text)
+    text = CSS_PUNCTUATION_RE.sub(r'\1', text)
+    text = text.replace(': ', ':').replace(';}', '}')
+    return text.strip()
+
+
+def minify_js(text):
+    """
+    Консервативная минификация без разбора синтаксиса: отступы,
+    пустые строки и строки-комментарии. Переводы строк сохраняются,
+    поэтому автоматическая расстановка точек с запятой не меняется.
+    """
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def _minifier(name):
+    if '.min.' in name:
+        return None
+    for ext, minifier in MINIFIERS.items():
+        if name.endswith(ext):
+            return minifier
+    return None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def _save(self, name, content):
+        minifier = _minifier(name)
+        if minifier is not None:
+            # post_process передает файл, уже прочитанный для подсчета хэша
+            content.seek(0)
+            text = content.read().decode('utf-8')
+            content = ContentFile(minifier(text).encode('utf-8'))
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        for hashed_name in sorted(hashed_names):
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        """Сжатые копии name.gz и name.br, если они меньше исходного файла"""
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+
+        # mtime=0: одинаковый файл дает одинаковый архив при каждом collectstatic
+        variants = {'gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(data, quality=11)
+
+        for suffix, compressed in variants.items():
+            compressed_name = f'{name}.{suffix}'
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            if len(compressed) < len(data):
+                # Минуем _save этого класса: архив не минифицируется
+                super()._save(compressed_name, ContentFile(compressed))
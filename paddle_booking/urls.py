@@ -1,7 +1,6 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from django.views.generic import TemplateView
 from . import views
 
@@ -22,4 +21,10 @@ urlpatterns = [
 
                   # Пользователи - отдельное приложение
                   path('users/', include('users.urls')),
-              ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+
+                  # Загруженные файлы с заголовками кэширования
+                  re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<path>.*)$', views.media, name='media'),
+
+                  # Собранная статика со сжатием и кэшированием (при DEBUG статику отдает runserver)
+                  re_path(rf'^{settings.STATIC_URL.strip("/")}/(?P<path>.*)$', views.static, name='static'),
+              ]
\ No newline at end of file
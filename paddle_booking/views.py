@@ -1,6 +1,28 @@
+import logging
+import os
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.contrib.staticfiles.storage import staticfiles_storage
 from django.shortcuts import render
-from booking.models import Court
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import etag
+from django.views.static import serve
+from booking.models import Court, get_courts_version
 from django.utils import timezone
+from users import avatar_jobs
+
+logger = logging.getLogger(__name__)
+
+# Кэширование медиафайлов, чье имя не задано содержимым (секунды)
+MEDIA_CACHE_MAX_AGE = getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)
+
+# Кэширование статики без хэша в имени (секунды)
+STATIC_CACHE_MAX_AGE = getattr(settings, 'STATIC_CACHE_MAX_AGE', 3600)
+
+# Сжатые копии статики в порядке предпочтения: (кодировка, суффикс)
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
 
 
 def home(request):
@@ -17,16 +39,80 @@ def booking_page(request):
     courts = Court.objects.filter(is_available=True).order_by('name')
     today_date = timezone.now().date()
 
-    # Отладка (можно убрать после проверки)
-    print(f"DEBUG: Передано {courts.count()} кортов в шаблон")
-    for court in courts:
-        print(f"  - {court.name}: {court.price_per_hour} руб/час, доступен: {court.is_available}")
+    # Перечисление кортов строится только при включенном DEBUG-уровне
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "booking_page: корты %s",
+            ', '.join(f'{court.name} ({court.price_per_hour} руб/час)' for court in courts)
+        )
 
+    # Запрос кортов выполнится только при промахе кэша фрагмента
     return render(request, 'booking.html', {
         'courts': courts,
+        'courts_version': get_courts_version(),
         'today_date': today_date
     })
 
 
 def tournaments(request):
-    return render(request, 'tournaments.html')
\ No newline at end of file
+    return render(request, 'tournaments.html')
+
+def media_etag(request, path):
+    """ETag медиафайла: хэш из имени или mtime и размер без чтения файла"""
+    if avatar_jobs.is_content_addressed(path):
+        return os.path.basename(path)
+    try:
+        stat = os.stat(safe_join(settings.MEDIA_ROOT, path))
+    except (OSError, ValueError, SuspiciousFileOperation):
+        return None
+    return f'{int(stat.st_mtime)}-{stat.st_size}'
+
+
+@etag(media_etag)
+def media(request, path):
+    """
+    Отдача загруженных файлов с заголовками кэширования.
+    Файлы с хэшем содержимого в имени кэшируются навсегда (immutable).
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if avatar_jobs.is_content_addressed(path):
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=MEDIA_CACHE_MAX_AGE)
+    return response
+
+
+def _is_hashed_static(path):
+    """Имя статики с хэшем содержимого из манифеста collectstatic"""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None) or {}
+    return path in hashed_files.values()
+
+
+def static(request, path):
+    """
+    Отдача собранной статики из STATIC_ROOT (DEBUG = False).
+    Если браузер принимает сжатие и collectstatic положил сжатую копию,
+    отдается она; файлы с хэшем в имени кэшируются навсегда.
+    """
+    accepted = request.headers.get('Accept-Encoding', '')
+    served_path = path
+    for encoding, suffix in STATIC_ENCODINGS:
+        if encoding not in accepted:
+            continue
+        try:
+            compressed = safe_join(settings.STATIC_ROOT, path + suffix)
+        except SuspiciousFileOperation:
+            # Путь вне STATIC_ROOT - serve() ответит ошибкой сам
+            break
+        if os.path.isfile(compressed):
+            served_path = path + suffix
+            break
+
+    # serve() берет Content-Type и Content-Encoding из расширения (.css.gz)
+    response = serve(request, served_path, document_root=settings.STATIC_ROOT)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if _is_hashed_static(path):
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=STATIC_CACHE_MAX_AGE)
+    return response
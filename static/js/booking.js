@@ -33,6 +33,29 @@ document.addEventListener('DOMContentLoaded', function() {
     let selectedTimeSlot = null;
     let selectedDuration = 1;
 
+    // Доступность, загруженная одним запросом на всю неделю: ключ `${courtId}_${date}`.
+    // Запись живет недолго: слоты могут занять другие пользователи
+    const prefetchedSlots = {};
+    const PREFETCH_TTL_MS = 30000;
+
+    function getPrefetched(courtId, dateStr) {
+        const key = `${courtId}_${dateStr}`;
+        const entry = prefetchedSlots[key];
+        if (entry && Date.now() - entry.fetchedAt > PREFETCH_TTL_MS) {
+            delete prefetchedSlots[key];
+            return null;
+        }
+        return entry || null;
+    }
+
+    function dropPrefetched(courtId, dateStr) {
+        delete prefetchedSlots[`${courtId}_${dateStr}`];
+    }
+
+    function clearPrefetched() {
+        Object.keys(prefetchedSlots).forEach(key => delete prefetchedSlots[key]);
+    }
+
     // Проверяем авторизацию
     let isUserAuthenticated = false;
     if (document.body.classList.contains('user-authenticated')) {
@@ -172,6 +195,8 @@ document.addEventListener('DOMContentLoaded', function() {
 
         weekNav.innerHTML = '';
 
+        prefetchWeekAvailability(startDate);
+
         for (let i = 0; i < 7; i++) {
             const currentDate = new Date(startDate);
             currentDate.setDate(startDate.getDate() + i);
@@ -242,6 +267,47 @@ document.addEventListener('DOMContentLoaded', function() {
         console.log('✅ Неделя отрисована');
     }
 
+    // Предзагрузка доступности всех кортов на неделю одним запросом
+    function prefetchWeekAvailability(startDate) {
+        const today = new Date();
+        today.setHours(0, 0, 0, 0);
+        const fromDate = startDate < today ? today : startDate;
+        const days = 7 - Math.round((fromDate - startDate) / 86400000);
+        if (days <= 0) return;
+
+        const url = `/booking/availability-matrix/?date=${formatDate(fromDate)}&days=${days}`;
+
+        fetch(url, {
+            method: 'GET',
+            headers: {
+                'Accept': 'application/json',
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+        .then(response => response.ok ? response.json() : null)
+        .then(data => {
+            if (!data || !data.success) return;
+
+            const fetchedAt = Date.now();
+            data.courts.forEach(court => {
+                Object.entries(court.days).forEach(([dateStr, day]) => {
+                    prefetchedSlots[`${court.court_id}_${dateStr}`] = {
+                        success: true,
+                        slots: day.slots,
+                        court_price: court.court_price,
+                        court_name: court.court_name,
+                        available_count: day.available_count,
+                        fetchedAt: fetchedAt
+                    };
+                });
+            });
+            console.log('📦 Доступность недели загружена:', data.courts.length, 'кортов');
+        })
+        .catch(error => {
+            console.warn('⚠️ Не удалось предзагрузить доступность недели:', error);
+        });
+    }
+
     // Обновление заголовка месяца
     function updateMonthHeader(startDate) {
         if (!monthHeader) return;
@@ -495,6 +561,13 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         }
 
+        const prefetched = getPrefetched(courtId, dateStr);
+        if (prefetched) {
+            console.log('📦 Слоты взяты из предзагруженной недели');
+            renderTimeSlotsBySections(prefetched.slots, prefetched.court_price, prefetched.court_name);
+            return;
+        }
+
         const url = `/booking/available-slots/?court=${courtId}&date=${dateStr}`;
         console.log('📡 Fetch URL:', url);
 
@@ -1052,14 +1125,16 @@ document.addEventListener('DOMContentLoaded', function() {
                 // Недоступно
                 showErrorMessage(data.message || 'Выбранное время уже занято');
 
-                // Перезагружаем слоты
+                // Предзагруженные слоты устарели - перезагружаем с сервера
                 if (selectedCourt) {
+                    dropPrefetched(selectedCourt, formatDate(selectedDate));
                     loadTimeSlots(selectedCourt, formatDate(selectedDate));
                 }
             }
         })
         .catch(error => {
             console.error('Error checking availability:', error);
+            dropPrefetched(selectedCourt, formatDate(selectedDate));
             showErrorMessage('Ошибка при проверке доступности');
         });
     }
@@ -1308,7 +1383,8 @@ document.addEventListener('DOMContentLoaded', function() {
             confirmBtn.disabled = true;
             cancelBtn.disabled = true;
 
-            // Отправляем форму
+            // Отправляем форму; после бронирования доступность изменилась
+            clearPrefetched();
             const form = modal.querySelector('#booking-form');
             form.submit();
         });
@@ -0,0 +1,298 @@
+"""
+Фоновая обработка аватарок.
+
+Запрос только сохраняет исходный файл и ставит задачу в очередь пула
+процессов: декодирование, обрезка и масштабирование не занимают
+worker, обслуживающий бронирования. Результат записывается в профиль
+по завершении задачи.
+"""
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Количество процессов обработки; 0 - обрабатывать прямо в запросе
+AVATAR_WORKERS = getattr(settings, 'AVATAR_WORKERS', 2)
+
+# Размеры производных аватарки (сторона квадрата); основной файл - самый большой
+AVATAR_SIZES = tuple(sorted(getattr(settings, 'AVATAR_SIZES', (32, 64, 150, 300))))
+
+# Расширения производных: JPEG для всех браузеров и более легкий WebP
+AVATAR_FORMATS = {'jpg': ('JPEG', {'quality': 85}), 'webp': ('WEBP', {'quality': 80})}
+
+# Длина хэша содержимого в имени файла
+CONTENT_HASH_LENGTH = 16
+
+# Имя производной: <каталог/><хэш>_<размер>.<расширение>. Старые имена
+# вида avatar_<id>_<uuid>.jpg сюда не подходят, даже если uuid из цифр
+CONTENT_ADDRESSED_RE = re.compile(
+    r'^(?P<base>(?:.*/)?[0-9a-f]{%d})_(?P<size>[1-9]\d*)\.(?P<ext>jpg|webp)$' % CONTENT_HASH_LENGTH
+)
+
+# Задача, не завершившаяся за это время, считается потерянной (секунды):
+# пул процессов не переживает перезапуск сервера
+AVATAR_PENDING_TIMEOUT = getattr(settings, 'AVATAR_PENDING_TIMEOUT', 300)
+
+# Файлы моложе этого срока sweep не удаляет (секунды)
+AVATAR_SWEEP_GRACE = getattr(settings, 'AVATAR_SWEEP_GRACE', 3600)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def render_avatar(path, sizes=AVATAR_SIZES):
+    """
+    Квадратные производные аватарки за одно декодирование:
+    {(размер, расширение): байты} для каждого размера в JPEG и WebP.
+    Выполняется в процессе пула, поэтому не обращается к Django.
+    """
+    largest = max(sizes)
+    img = Image.open(path)
+
+    # JPEG сразу декодируется в уменьшенном масштабе (1/2, 1/4, 1/8),
+    # но не меньше нужного размера по обеим сторонам
+    img.draft('RGB', (largest, largest))
+
+    # Конвертируем в RGB если нужно
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    # Обрезаем до квадрата по центру
+    width, height = img.size
+    min_size = min(width, height)
+    left = (width - min_size) // 2
+    top = (height - min_size) // 2
+    img = img.crop((left, top, left + min_size, top + min_size))
+
+    variants = {}
+    # От большего к меньшему: каждый размер получается из предыдущего
+    for size in sorted(sizes, reverse=True):
+        img = img.resize((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for ext, (fmt, options) in AVATAR_FORMATS.items():
+            buffer = io.BytesIO()
+            img.save(buffer, format=fmt, **options)
+            variants[(size, ext)] = buffer.getvalue()
+    return variants
+
+
+def _match_variant(name):
+    """Разбор имени производной; None, если имя не из хэша и размера AVATAR_SIZES"""
+    match = CONTENT_ADDRESSED_RE.match(name or '')
+    if match and int(match.group('size')) in AVATAR_SIZES:
+        return match
+    return None
+
+
+def variant_name(name, size=None, ext='jpg'):
+    """
+    Имя производной основного файла name для показа в size пикселей:
+    наименьший размер не меньше size. None для аватарок старого формата.
+    """
+    match = _match_variant(name)
+    if not match:
+        return None
+
+    if size is None:
+        size = AVATAR_SIZES[-1]
+    fitting = [s for s in AVATAR_SIZES if s >= size]
+    size = fitting[0] if fitting else AVATAR_SIZES[-1]
+    return f"{match.group('base')}_{size}.{ext}"
+
+
+def variant_names(name):
+    """Все файлы аватарки: основной и производные"""
+    match = _match_variant(name)
+    if not match:
+        return [name] if name else []
+    return [f"{match.group('base')}_{size}.{ext}" for size in AVATAR_SIZES for ext in AVATAR_FORMATS]
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Не fork: в процессе сервера уже работают потоки (слушатель очереди логов),
+            # а fork многопоточного процесса может зависнуть на чужой блокировке
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _executor = ProcessPoolExecutor(
+                max_workers=AVATAR_WORKERS, mp_context=multiprocessing.get_context(method)
+            )
+        return _executor
+
+
+def submit(profile_id, source_name):
+    """Поставить обработку загруженного файла в очередь"""
+    if AVATAR_WORKERS <= 0:
+        try:
+            content = render_avatar(default_storage.path(source_name))
+        except Exception as e:
+            finish(profile_id, source_name, error=e)
+        else:
+            finish(profile_id, source_name, content=content)
+        return
+
+    future = _get_executor().submit(render_avatar, default_storage.path(source_name))
+    future.add_done_callback(partial(_on_done, profile_id, source_name))
+
+
+def _on_done(profile_id, source_name, future):
+    # Колбэк выполняется в служебном потоке пула со своим соединением с БД
+    close_old_connections()
+    try:
+        error = future.exception()
+        if error is not None:
+            finish(profile_id, source_name, error=error)
+        else:
+            finish(profile_id, source_name, content=future.result())
+    except Exception:
+        logger.error("Ошибка сохранения аватарки профиля %s", profile_id, exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def finish(profile_id, source_name, content=None, error=None):
+    """Записать результат обработки в профиль и удалить исходный файл"""
+    from .models import UserProfile, invalidate_navbar_on_commit
+
+    try:
+        # Пока файл обрабатывался, могли загрузить новый - результат устарел
+        if not UserProfile.objects.filter(pk=profile_id, avatar_pending=source_name).exists():
+            return
+
+        updates = {'avatar_pending': '', 'avatar_pending_since': None}
+        if error is not None:
+            logger.error("Ошибка обработки аватарки профиля %s: %s", profile_id, error)
+            updates['avatar_failed'] = True
+        else:
+            # Исходный файл назван по хэшу содержимого: raw/<хэш>_<суффикс>.<ext>
+            base = avatar_base(os.path.basename(source_name).split('_')[0])
+            for (size, ext), data in content.items():
+                name = f'{base}_{size}.{ext}'
+                # Такой же файл мог уже записать другой профиль
+                if not default_storage.exists(name):
+                    default_storage.save(name, ContentFile(data))
+            updates['avatar'] = main_name(base)
+
+        # Условное обновление: новая загрузка, начатая за это время, не затирается.
+        # Заменяемые файлы не удаляются здесь - их уберет sweep
+        updated = UserProfile.objects.filter(
+            pk=profile_id, avatar_pending=source_name
+        ).update(**updates)
+        if updated and 'avatar' in updates:
+            user_id = UserProfile.objects.filter(pk=profile_id).values_list('user_id', flat=True).first()
+            invalidate_navbar_on_commit(user_id)
+    finally:
+        default_storage.delete(source_name)
+
+
+def is_stale(profile, timeout=AVATAR_PENDING_TIMEOUT):
+    """Обработка аватарки профиля идет дольше timeout секунд - задача потеряна"""
+    if not profile.avatar_pending:
+        return False
+    since = profile.avatar_pending_since
+    return since is None or since < timezone.now() - timedelta(seconds=timeout)
+
+
+def expire_pending(profiles=None, timeout=AVATAR_PENDING_TIMEOUT):
+    """
+    Пометить ошибкой обработки, начатые раньше timeout секунд назад, и удалить
+    их исходные файлы. profiles - queryset профилей, по умолчанию все.
+    Возвращает количество снятых задач.
+    """
+    from .models import UserProfile
+
+    if profiles is None:
+        profiles = UserProfile.objects.all()
+
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = profiles.exclude(avatar_pending='').filter(
+        Q(avatar_pending_since__isnull=True) | Q(avatar_pending_since__lt=cutoff)
+    ).values_list('pk', 'avatar_pending')
+
+    expired = 0
+    for profile_id, source_name in list(stale):
+        # Условное обновление: задача могла завершиться или начаться новая
+        if UserProfile.objects.filter(pk=profile_id, avatar_pending=source_name).update(
+            avatar_pending='', avatar_pending_since=None, avatar_failed=True
+        ):
+            logger.warning("Обработка аватарки профиля %s не завершилась за %s с", profile_id, timeout)
+            default_storage.delete(source_name)
+            expired += 1
+    return expired
+
+
+def content_hash(image_file):
+    """Хэш содержимого загруженного файла - основа имени аватарки"""
+    digest = hashlib.sha256()
+    for chunk in image_file.chunks():
+        digest.update(chunk)
+    image_file.seek(0)
+    return digest.hexdigest()[:CONTENT_HASH_LENGTH]
+
+
+def avatar_base(digest):
+    return f'{settings.AVATAR_UPLOAD_DIR}{digest}'
+
+
+def main_name(base):
+    """Основной файл аватарки - самый большой JPEG"""
+    return f'{base}_{AVATAR_SIZES[-1]}.jpg'
+
+
+def is_content_addressed(name):
+    """Имя файла задано хэшем содержимого, и содержимое по нему никогда не меняется"""
+    return _match_variant(name) is not None
+
+
+def sweep(grace_seconds=AVATAR_SWEEP_GRACE, dry_run=False):
+    """
+    Удалить файлы аватарок, на которые не ссылается ни один профиль (mark-and-sweep).
+    Отмечаются файлы аватарок профилей и исходники обработок в очереди,
+    удаляются неотмеченные. Файлы моложе grace_seconds не трогаются -
+    их транзакция могла еще не закоммититься.
+    Возвращает список удаленных (при dry_run - подлежащих удалению) файлов.
+    """
+    from .models import UserProfile
+
+    # Каждый основной файл отмечается один раз: сохраненное имя как есть
+    # и производные, если имя в формате хэша
+    referenced = set()
+    for name in UserProfile.objects.exclude(avatar='').exclude(
+        avatar__isnull=True
+    ).values_list('avatar', flat=True).distinct():
+        referenced.add(name)
+        referenced.update(variant_names(name))
+    referenced.update(
+        UserProfile.objects.exclude(avatar_pending='').values_list('avatar_pending', flat=True)
+    )
+
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    removed = []
+    for directory in (settings.AVATAR_UPLOAD_DIR, f'{settings.AVATAR_UPLOAD_DIR}raw/'):
+        if not default_storage.exists(directory):
+            continue
+
+        for filename in default_storage.listdir(directory)[1]:
+            name = f'{directory}{filename}'
+            if name in referenced or default_storage.get_modified_time(name) > cutoff:
+                continue
+            if not dry_run:
+                default_storage.delete(name)
+            removed.append(name)
+    return removed
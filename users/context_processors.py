@@ -0,0 +1,25 @@
+"""
+Данные для навигации (partials/navbar.html). Навигация кэшируется
+фрагментом по пользователю, его версии навигации и разделу меню.
+"""
+from django.conf import settings
+
+from .models import get_navbar_version
+
+# Время жизни фрагментов шаблонов (секунды); ключи версионируются, поэтому срок большой
+FRAGMENT_CACHE_TTL = getattr(settings, 'FRAGMENT_CACHE_TTL', 86400)
+
+# Разделы меню, подсвечиваемые в навигации (имена URL)
+NAV_SECTIONS = ('news', 'booking', 'tournaments')
+
+
+def navbar(request):
+    match = getattr(request, 'resolver_match', None)
+    url_name = match.url_name if match else None
+    user = getattr(request, 'user', None)
+    authenticated = user is not None and user.is_authenticated
+    return {
+        'fragment_cache_ttl': FRAGMENT_CACHE_TTL,
+        'nav_section': url_name if url_name in NAV_SECTIONS else '',
+        'navbar_version': get_navbar_version(user.pk) if authenticated else 0,
+    }
@@ -3,9 +3,12 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.db import transaction, IntegrityError
-from .models import UserProfile
+from .models import UserProfile, normalize_phone
 import re
 import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class EmailUpdateForm(forms.ModelForm):
@@ -160,35 +163,13 @@ class RegistrationForm(UserCreationForm):
 
         formatted_phone = '+' + phone_digits
 
-        # СТРОГАЯ проверка уникальности
-        # 1. Проверяем точное совпадение
-        if UserProfile.objects.filter(phone=formatted_phone).exists():
-            existing = UserProfile.objects.get(phone=formatted_phone)
+        # Проверка уникальности одним запросом по индексу нормализованного номера
+        existing = UserProfile.objects.filter(
+            phone_normalized=formatted_phone
+        ).select_related('user').first()
+        if existing:
             raise ValidationError(f'Номер телефона уже используется пользователем {existing.user.username}')
 
-        # 2. Проверяем другие форматы этого же номера
-        other_formats = [
-            '8' + phone_digits[1:],  # 89123456789
-            phone_digits,  # 79123456789
-            phone_digits[1:],  # 9123456789
-            '7' + phone_digits[1:],  # 79123456789 (дубль)
-        ]
-
-        # Убираем дубликаты
-        other_formats = list(set(other_formats))
-
-        for fmt in other_formats:
-            if fmt != formatted_phone and UserProfile.objects.filter(phone=fmt).exists():
-                existing = UserProfile.objects.get(phone=fmt)
-                raise ValidationError(
-                    f'Этот номер телефона (в формате {fmt}) уже используется пользователем {existing.user.username}')
-
-        # 3. Проверяем нормализованные версии существующих номеров
-        for profile in UserProfile.objects.exclude(phone__isnull=True).exclude(phone=''):
-            existing_normalized = UserProfile.objects.normalize_phone(profile.phone)
-            if existing_normalized == formatted_phone:
-                raise ValidationError(f'Этот номер телефона уже используется пользователем {profile.user.username}')
-
         return formatted_phone
 
     def clean_username(self):
@@ -251,43 +232,29 @@ class RegistrationForm(UserCreationForm):
                 UserProfile.objects.filter(user=user).delete()
 
                 # 4. Проверяем уникальность телефона еще раз (на случай race condition)
-                if UserProfile.objects.filter(phone=phone).exists():
-                    # Ищем, кто уже использует этот телефон
-                    existing = UserProfile.objects.filter(phone=phone).first()
-                    if existing:
-                        raise ValidationError(
-                            f'Номер телефона {phone} уже используется пользователем {existing.user.username}'
-                        )
-                    else:
-                        raise ValidationError(f'Номер телефона {phone} уже зарегистрирован')
-
-                # 5. Проверяем другие форматы
-                phone_digits = phone[1:]  # Убираем +
-                other_formats = ['8' + phone_digits, phone_digits[1:]]
-
-                for fmt in other_formats:
-                    if UserProfile.objects.filter(phone=fmt).exists():
-                        existing = UserProfile.objects.filter(phone=fmt).first()
-                        raise ValidationError(
-                            f'Номер телефона уже используется пользователем {existing.user.username}'
-                        )
-
-                # 6. Создаем профиль
+                # по нормализованному номеру - он совпадает для всех форматов записи
+                existing = UserProfile.objects.filter(
+                    phone_normalized=normalize_phone(phone)
+                ).select_related('user').first()
+                if existing:
+                    raise ValidationError(
+                        f'Номер телефона {phone} уже используется пользователем {existing.user.username}'
+                    )
+
+                # 5. Создаем профиль
                 profile = UserProfile(user=user, phone=phone)
 
-                # 7. Генерируем код подтверждения
+                # 6. Генерируем код подтверждения
                 profile.generate_verification_code()
 
-                # 8. Сохраняем профиль (внутри будет еще одна проверка)
+                # 7. Сохраняем профиль (внутри будет еще одна проверка)
                 profile.save()
 
-                # 9. Логируем успешную регистрацию
-                print(f"\n{'=' * 50}")
-                print(f"УСПЕШНАЯ РЕГИСТРАЦИЯ")
-                print(f"Пользователь: {user.username}")
-                print(f"Телефон: {profile.phone}")
-                print(f"Уникальный ID: {user.id}")
-                print(f"{'=' * 50}\n")
+                # 8. Логируем успешную регистрацию
+                logger.info(
+                    "Успешная регистрация: пользователь %s, телефон %s, id %s",
+                    user.username, profile.phone, user.id
+                )
 
                 return user
 
@@ -377,10 +344,7 @@ class LoginForm(forms.Form):
                 # Для username проверяем существование пользователя
                 if not User.objects.filter(username=identifier_data['value']).exists():
                     self.add_error('identifier', 'Пользователь с таким именем не найден')
-            else:
-                # Для телефона проверяем существование профиля
-                if not UserProfile.objects.get_user_by_phone(identifier_data['value']):
-                    self.add_error('identifier', 'Пользователь с таким номером телефона не найден')
+            # Телефон уже сопоставлен с пользователем в clean_identifier
 
         return cleaned_data
 
@@ -438,19 +402,12 @@ class ProfileUpdateForm(forms.ModelForm):
 
         # Проверка уникальности (исключая текущего пользователя)
         if self.instance and hasattr(self.instance, 'profile'):
-            # Проверяем все форматы
-            other_formats = [
-                formatted_phone,
-                '8' + phone_digits[1:],
-                phone_digits,
-                phone_digits[1:],
-            ]
-
-            for fmt in other_formats:
-                qs = UserProfile.objects.filter(phone=fmt).exclude(user=self.instance)
-                if qs.exists():
-                    users = [p.user.username for p in qs]
-                    raise ValidationError(f'Этот номер телефона уже используется: {", ".join(users)}')
+            qs = UserProfile.objects.filter(
+                phone_normalized=formatted_phone
+            ).exclude(user=self.instance).select_related('user')
+            users = [p.user.username for p in qs]
+            if users:
+                raise ValidationError(f'Этот номер телефона уже используется: {", ".join(users)}')
 
         return formatted_phone
 
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from users import avatar_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Снимает зависшие обработки аватарок и удаляет файлы, '
+        'на которые не ссылается ни один профиль (запускать по расписанию)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать файлы, которые будут удалены'
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=avatar_jobs.AVATAR_SWEEP_GRACE,
+            help='Не удалять файлы моложе стольких секунд'
+        )
+
+    def handle(self, *args, **options):
+        if not options['dry_run']:
+            # Потерянные задачи снимаются до поиска неиспользуемых файлов
+            expired = avatar_jobs.expire_pending()
+            if expired:
+                self.stdout.write(f'Снято зависших обработок: {expired}')
+
+        removed = avatar_jobs.sweep(options['grace'], dry_run=options['dry_run'])
+
+        if options['verbosity'] > 1 or options['dry_run']:
+            for name in removed:
+                self.stdout.write(f'  {name}')
+
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(f'{action} файлов: {len(removed)}'))
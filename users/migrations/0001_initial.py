@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:02
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numeric_rating', models.DecimalField(decimal_places=2, default=1.0, help_text='Значение от 1.00 до 7.00', max_digits=3, verbose_name='Числовой рейтинг')),
+                ('level', models.CharField(choices=[('D', 'Уровень 1 (D): Новичок'), ('D+', 'Уровень 1+ (D+): Начинающий'), ('C-', 'Уровень 2 (C-): Начинающий / Слабый средний'), ('C', 'Уровень 2+ (C): Средний'), ('C+', 'Уровень 3 (C+): Средний / Крепкий любитель'), ('B-', 'Уровень 3+ (B-): Крепкий любитель'), ('B', 'Уровень 4 (B): Продвинутый'), ('B+', 'Уровень 4+ (B+): Топ-любитель'), ('A', 'Уровень 5/5+ (A): Кандидат/Мастер спорта'), ('PRO', 'Уровень 6-7 (Pro): Профессионал')], default='D', editable=False, max_length=10, verbose_name='Уровень')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('coach_comment', models.TextField(blank=True, verbose_name='Комментарий тренера')),
+                ('rating_history', models.JSONField(blank=True, default=list, verbose_name='История рейтинга')),
+                ('updated_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ratings_updated', to=settings.AUTH_USER_MODEL, verbose_name='Кем обновлен')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating', to=settings.AUTH_USER_MODEL, verbose_name='Игрок')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг игрока',
+                'verbose_name_plural': 'Рейтинги игроков',
+                'ordering': ['-numeric_rating'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone', models.CharField(max_length=17, unique=True, validators=[django.core.validators.RegexValidator(message="Номер телефона должен быть в формате: '+79123456789'", regex='^\\+?1?\\d{9,15}$')], verbose_name='Номер телефона')),
+                ('phone_verified', models.BooleanField(default=False, verbose_name='Телефон подтвержден')),
+                ('verification_code', models.CharField(blank=True, max_length=6, null=True)),
+                ('birth_date', models.DateField(blank=True, null=True, verbose_name='Дата рождения')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата регистрации')),
+                ('avatar', models.ImageField(blank=True, null=True, upload_to='avatars/', verbose_name='Аватар')),
+                ('preferences', models.JSONField(blank=True, default=dict, verbose_name='Предпочтения')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['phone'], name='users_userp_phone_ed0c08_idx')],
+                'constraints': [models.UniqueConstraint(fields=('phone',), name='unique_userprofile_phone')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:10
+
+import re
+
+from django.db import migrations, models
+
+
+def normalize_phone(phone):
+    """Копия users.models.normalize_phone на момент миграции"""
+    if not phone:
+        return None
+
+    digits = re.sub(r'\D', '', str(phone))
+    if not digits:
+        return None
+
+    if len(digits) == 10 and digits.startswith('9'):
+        digits = '7' + digits
+    elif len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    elif len(digits) == 10:
+        digits = '7' + digits
+
+    if len(digits) != 11:
+        return None
+
+    return '+' + digits
+
+
+def fill_phone_normalized(apps, schema_editor):
+    """Заполнить нормализованный номер для существующих профилей"""
+    UserProfile = apps.get_model('users', 'UserProfile')
+
+    batch = []
+    for profile in UserProfile.objects.only('id', 'phone').iterator(chunk_size=500):
+        profile.phone_normalized = normalize_phone(profile.phone)
+        batch.append(profile)
+        if len(batch) >= 500:
+            UserProfile.objects.bulk_update(batch, ['phone_normalized'])
+            batch = []
+    if batch:
+        UserProfile.objects.bulk_update(batch, ['phone_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='phone_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True, verbose_name='Нормализованный номер'),
+        ),
+        migrations.RunPython(fill_phone_normalized, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_userprofile_phone_normalized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_pending',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Аватар в обработке'),
+        ),
+    ]
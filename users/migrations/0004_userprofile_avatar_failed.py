@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_userprofile_avatar_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_failed',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Ошибка обработки аватара'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_pending_since',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Аватар в обработке с'),
+        ),
+    ]
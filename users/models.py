@@ -5,42 +5,111 @@ from django.dispatch import receiver
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 from django.db import transaction, IntegrityError
+import logging
 import re
 import random
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 import os
-from PIL import Image
-import io
 from django.conf import settings
 from django.utils import timezone
 
+from paddle_booking import caching
 
-class UserProfileManager(models.Manager):
-    def normalize_phone(self, phone):
-        """Нормализует номер телефона для сравнения"""
-        if not phone:
-            return None
+from . import avatar_jobs
 
-        # Убираем все нецифровые символы
-        digits = re.sub(r'\D', '', str(phone))
+logger = logging.getLogger(__name__)
 
-        if not digits:
-            return None
 
-        # Нормализуем российский номер
-        if len(digits) == 10 and digits.startswith('9'):
-            digits = '7' + digits
-        elif len(digits) == 11 and digits.startswith('8'):
-            digits = '7' + digits[1:]
-        elif len(digits) == 10:
-            digits = '7' + digits
+def normalize_phone(phone):
+    """Нормализует номер телефона к формату +7XXXXXXXXXX, None если номер некорректен"""
+    if not phone:
+        return None
 
-        # Должно быть 11 цифр для российского номера
-        if len(digits) != 11:
-            return None
+    # Убираем все нецифровые символы
+    digits = re.sub(r'\D', '', str(phone))
+
+    if not digits:
+        return None
+
+    # Нормализуем российский номер
+    if len(digits) == 10 and digits.startswith('9'):
+        digits = '7' + digits
+    elif len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    elif len(digits) == 10:
+        digits = '7' + digits
+
+    # Должно быть 11 цифр для российского номера
+    if len(digits) != 11:
+        return None
+
+    return '+' + digits
+
+
+# Временные номера профилей, созданных без телефона: +7980XXXXXXX
+PLACEHOLDER_PHONE_PREFIX = '+7980'
+PLACEHOLDER_PHONE_DIGITS = 7
 
-        return '+' + digits
+
+class UserProfileManager(models.Manager):
+    def normalize_phone(self, phone):
+        """Нормализует номер телефона для сравнения"""
+        return normalize_phone(phone)
+
+    def placeholder_phones(self, count):
+        """
+        count свободных временных номеров.
+        Кандидаты генерируются в памяти и проверяются одним запросом по индексам.
+        """
+        phones = set()
+        while len(phones) < count:
+            need = count - len(phones)
+            candidates = {
+                f'{PLACEHOLDER_PHONE_PREFIX}{random.randrange(10 ** PLACEHOLDER_PHONE_DIGITS):0{PLACEHOLDER_PHONE_DIGITS}d}'
+                for _ in range(need * 2)
+            } - phones
+
+            taken = set()
+            for phone, normalized in self.filter(
+                models.Q(phone__in=candidates) | models.Q(phone_normalized__in=candidates)
+            ).values_list('phone', 'phone_normalized'):
+                taken.update((phone, normalized))
+
+            phones.update(list(candidates - taken)[:need])
+        return list(phones)
+
+    def create_missing_profiles(self, user_ids=None, batch_size=500):
+        """
+        Создать профили с временными номерами для пользователей без профиля.
+        Пользователи ищутся одним anti-join, профили пишутся через bulk_create.
+        Возвращает количество пользователей, которым нужен был профиль
+        (профиль, созданный параллельно, тоже учитывается).
+        """
+        users = User.objects.filter(profile__isnull=True)
+        if user_ids is not None:
+            users = users.filter(pk__in=user_ids)
+
+        missing = list(users.values_list('pk', flat=True))
+        if not missing:
+            return 0
+
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i:i + batch_size]
+            phones = self.placeholder_phones(len(batch))
+            # Профиль, созданный параллельно, просто пропускается
+            self.bulk_create([
+                UserProfile(user_id=user_id, phone=phone, phone_normalized=phone)
+                for user_id, phone in zip(batch, phones)
+            ], ignore_conflicts=True)
+        return len(missing)
+
+    def create_placeholder(self, user_id):
+        """Профиль с временным номером для только что созданного пользователя без anti-join"""
+        phone = self.placeholder_phones(1)[0]
+        return self.bulk_create([UserProfile(user_id=user_id, phone=phone, phone_normalized=phone)])[0]
 
     def get_user_by_phone(self, phone):
         """Найти пользователя по номеру телефона"""
@@ -49,29 +118,13 @@ class UserProfileManager(models.Manager):
         if not normalized_phone:
             return None
 
-        # Ищем профиль с таким номером
-        try:
-            profile = UserProfile.objects.get(phone=normalized_phone)
-            return profile.user
-        except UserProfile.DoesNotExist:
-            # Пробуем другие форматы
-            phone_digits = normalized_phone[1:]  # Убираем +
-
-            # Формат без + в начале
-            try:
-                profile = UserProfile.objects.get(phone=phone_digits)
-                return profile.user
-            except UserProfile.DoesNotExist:
-                pass
-
-            # Формат с 8 в начале
-            try:
-                profile = UserProfile.objects.get(phone='8' + phone_digits[1:])
-                return profile.user
-            except UserProfile.DoesNotExist:
-                pass
-
-        return None
+        # Один запрос по индексу нормализованного номера вместе с пользователем
+        profile = UserProfile.objects.select_related('user').filter(
+            phone_normalized=normalized_phone
+        ).first()
+        if profile is None:
+            return None
+        return profile.user
 
 
 class UserProfile(models.Model):
@@ -90,6 +143,16 @@ class UserProfile(models.Model):
         verbose_name='Номер телефона'
     )
 
+    # Номер в формате +7XXXXXXXXXX для поиска независимо от формата ввода
+    phone_normalized = models.CharField(
+        max_length=12,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name='Нормализованный номер'
+    )
+
     phone_verified = models.BooleanField(default=False, verbose_name='Телефон подтвержден')
     verification_code = models.CharField(max_length=6, blank=True, null=True)
 
@@ -100,6 +163,27 @@ class UserProfile(models.Model):
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True, verbose_name='Аватар')
     preferences = models.JSONField(default=dict, blank=True, verbose_name='Предпочтения')
 
+    # Исходный файл аватарки, которая еще обрабатывается в фоне
+    avatar_pending = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name='Аватар в обработке'
+    )
+    # Начало фоновой обработки: задача, потерянная при перезапуске, снимается по таймауту
+    avatar_pending_since = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Аватар в обработке с'
+    )
+    # Последняя фоновая обработка завершилась ошибкой
+    avatar_failed = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Ошибка обработки аватара'
+    )
+
     objects = UserProfileManager()
 
     class Meta:
@@ -129,7 +213,7 @@ class UserProfile(models.Model):
             raise ValidationError({'phone': 'Неверный формат номера телефона'})
 
         # Проверяем уникальность
-        qs = UserProfile.objects.filter(phone=normalized)
+        qs = UserProfile.objects.filter(phone_normalized=normalized)
         if self.pk:
             qs = qs.exclude(pk=self.pk)
 
@@ -147,6 +231,11 @@ class UserProfile(models.Model):
         # Всегда вызываем clean для валидации
         self.full_clean()
 
+        self.phone_normalized = normalize_phone(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_normalized'}
+
         # Сохраняем с блокировкой транзакции
         try:
             with transaction.atomic():
@@ -171,159 +260,241 @@ class UserProfile(models.Model):
         import random
         self.verification_code = f"{random.randint(100000, 999999)}"
         self.save()
-        print(
-            f"ГЕНЕРАЦИЯ КОДА: Для пользователя {self.user.username}, телефон {self.phone}, код: {self.verification_code}")
+        # Сам код в лог не пишется: файл лога хранится на диске
+        logger.info("Создан код подтверждения для пользователя %s", self.user.username)
         return self.verification_code
 
     def verify_phone(self, code):
         """Подтверждение телефона"""
-        print(f"ПРОВЕРКА КОДА ДЛЯ {self.user.username}:")
-        print(f"  Введенный код: {code}")
-        print(f"  Код в БД: {self.verification_code}")
-        print(f"  Тип введенного: {type(code)}")
-        print(f"  Тип в БД: {type(self.verification_code)}")
-        print(f"  Совпадение: {str(self.verification_code) == str(code)}")
+        logger.debug("Проверка кода подтверждения для %s", self.user.username)
 
         if self.verification_code and str(self.verification_code) == str(code):
             self.phone_verified = True
             self.verification_code = None
             self.save()
-            print(f"  ✅ ТЕЛЕФОН ПОДТВЕРЖДЕН!")
+            logger.info("Телефон пользователя %s подтвержден", self.user.username)
             return True
 
-        print(f"  ❌ НЕВЕРНЫЙ КОД!")
+        logger.info("Неверный код подтверждения для %s", self.user.username)
         return False
 
     def save_avatar(self, image_file):
-        """Сохранение аватарки с обработкой"""
+        """
+        Принять аватарку: исходный файл сохраняется, обработка уходит в фон.
+        Пока она идет, avatar_pending содержит имя исходного файла.
+        """
+        # Проверяем расширение файла
+        filename = image_file.name.lower()
+        allowed_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
+        if not any(filename.endswith(ext) for ext in allowed_extensions):
+            raise ValidationError('Недопустимый формат файла. Разрешены: JPG, PNG, GIF, WebP')
+
+        # Проверяем размер файла
+        max_size = 5 * 1024 * 1024  # 5MB
+        if image_file.size > max_size:
+            raise ValidationError(f'Файл слишком большой. Максимальный размер: {max_size // 1024 // 1024}MB')
+
+        # Одинаковые файлы получают одно имя: повторная загрузка не обрабатывается заново
+        digest = avatar_jobs.content_hash(image_file)
+        ready_name = avatar_jobs.main_name(avatar_jobs.avatar_base(digest))
+        if default_storage.exists(ready_name):
+            self.avatar = ready_name
+            self.avatar_pending = ''
+            self.avatar_pending_since = None
+            self.avatar_failed = False
+            UserProfile.objects.filter(pk=self.pk).update(
+                avatar=ready_name, avatar_pending='', avatar_pending_since=None, avatar_failed=False
+            )
+            invalidate_navbar_on_commit(self.user_id)
+            return True
+
         try:
-            # Проверяем расширение файла
-            filename = image_file.name.lower()
-            allowed_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-            if not any(filename.endswith(ext) for ext in allowed_extensions):
-                raise ValidationError('Недопустимый формат файла. Разрешены: JPG, PNG, GIF, WebP')
-
-            # Проверяем размер файла
-            max_size = 5 * 1024 * 1024  # 5MB
-            if image_file.size > max_size:
-                raise ValidationError(f'Файл слишком большой. Максимальный размер: {max_size // 1024 // 1024}MB')
-
-            # Удаляем старую аватарку если есть
-            if self.avatar:
-                old_path = self.avatar.path
-                if os.path.exists(old_path):
-                    os.remove(old_path)
-
-            # Генерируем уникальное имя файла
             import uuid
             ext = os.path.splitext(filename)[1]
-            new_filename = f'avatar_{self.user.id}_{uuid.uuid4().hex[:8]}{ext}'
-
-            # Обрабатываем изображение
-            img = Image.open(image_file)
-
-            # Конвертируем в RGB если нужно
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-
-            # Создаем квадратное изображение
-            width, height = img.size
-            min_size = min(width, height)
-
-            # Обрезаем до квадрата
-            left = (width - min_size) // 2
-            top = (height - min_size) // 2
-            right = (width + min_size) // 2
-            bottom = (height + min_size) // 2
-            img = img.crop((left, top, right, bottom))
-
-            # Изменяем размер до 300x300
-            img = img.resize((300, 300), Image.Resampling.LANCZOS)
-
-            # Сохраняем аватарку
-            buffer = io.BytesIO()
-            img.save(buffer, format='JPEG', quality=85)
-            buffer.seek(0)
-
-            # Сохраняем в поле модели
-            self.avatar.save(new_filename, ContentFile(buffer.read()), save=True)
-
-            return True
-
+            source_name = default_storage.save(
+                f'{settings.AVATAR_UPLOAD_DIR}raw/{digest}_{uuid.uuid4().hex[:8]}{ext}',
+                image_file
+            )
         except Exception as e:
-            print(f"Ошибка при сохранении аватарки: {str(e)}")
+            logger.error("Ошибка при сохранении аватарки: %s", e, exc_info=True)
             raise ValidationError(f'Ошибка при обработке изображения: {str(e)}')
 
-    def get_avatar_url(self):
-        """Получение URL аватарки"""
-        if self.avatar:
+        # Незаконченная предыдущая загрузка будет отброшена avatar_jobs.finish
+        previous = self.avatar_pending
+        self.avatar_pending = source_name
+        self.avatar_pending_since = timezone.now()
+        self.avatar_failed = False
+        UserProfile.objects.filter(pk=self.pk).update(
+            avatar_pending=source_name, avatar_pending_since=self.avatar_pending_since, avatar_failed=False
+        )
+        if previous:
+            default_storage.delete(previous)
+
+        transaction.on_commit(lambda: avatar_jobs.submit(self.pk, source_name))
+        return True
+
+    def get_avatar_url(self, size=None, ext='jpg'):
+        """
+        URL аватарки для показа в size пикселей: наименьшая подходящая производная.
+        ext='webp' - вариант в WebP.
+        """
+        if not self.avatar:
+            return None
+
+        name = avatar_jobs.variant_name(self.avatar.name, size, ext)
+        if name is None:
+            # Аватарка загружена до появления производных
             return self.avatar.url
-        return None
+        return self.avatar.storage.url(name)
 
     def delete_avatar(self):
         """Удаление аватарки"""
         if self.avatar:
             try:
-                # Получаем путь к файлу
-                if hasattr(self.avatar, 'path'):
-                    path = self.avatar.path
-                    if os.path.exists(path):
-                        os.remove(path)
-
-                # Удаляем поле из модели
-                self.avatar.delete(save=False)
+                # Файлы могут использоваться другими профилями - их уберет sweep
                 self.avatar = None
+                self.avatar_pending = ''
+                self.avatar_pending_since = None
                 self.save()
+                invalidate_navbar_on_commit(self.user_id)
                 return True
             except Exception as e:
-                print(f"Ошибка при удалении аватарки: {str(e)}")
+                logger.error("Ошибка при удалении аватарки: %s", e, exc_info=True)
                 return False
         return False
 
     def get_rating(self):
         """Получить или создать рейтинг для пользователя"""
-        from .models import PlayerRating
-
-        if not hasattr(self.user, 'rating'):
-            # Создаем рейтинг по умолчанию
-            rating = PlayerRating.objects.create(
-                user=self.user,
-                numeric_rating=1.00,
-                level='D'
-            )
-            return rating
-        return self.user.rating
+        return PlayerRating.objects.for_user(self.user)
+
+
+def navbar_version_key(user_id):
+    return caching.make_key('navbar', 'version', user_id)
+
+
+def get_navbar_version(user_id):
+    """Версия закэшированной навигации пользователя (имя и аватарка)"""
+    return caching.get_version(navbar_version_key(user_id))
+
+
+def invalidate_navbar_on_commit(user_id):
+    """Сбросить закэшированную навигацию пользователя после фиксации транзакции"""
+    caching.bump_version_on_commit(navbar_version_key(user_id))
+
+
+# Пользователи, чье создание профиля и рейтинга отложено (см. defer_provisioning)
+_provisioning = threading.local()
+
+
+def provision_users(user_ids=None, with_profiles=True, batch_size=500):
+    """
+    Единая точка создания профиля и рейтинга для новых пользователей.
+    Обе записи создаются в одной транзакции через bulk_create, поэтому
+    подходит и для одного пользователя, и для массового импорта.
+    Возвращает пару (создано профилей, создано рейтингов).
+    Только что созданному пользователю записи создает provision_new_user напрямую.
+    """
+    with transaction.atomic():
+        profiles = 0
+        if with_profiles:
+            profiles = UserProfile.objects.create_missing_profiles(user_ids, batch_size=batch_size)
+        ratings = PlayerRating.objects.create_missing(user_ids, batch_size=batch_size)
+    return profiles, ratings
+
+
+@contextmanager
+def defer_provisioning():
+    """
+    Отложить создание профилей и рейтингов до выхода из блока.
+    Для массового импорта: вместо запросов на каждого пользователя
+    все созданные в блоке пользователи обрабатываются одним пакетом.
+    """
+    if getattr(_provisioning, 'pending', None) is not None:
+        # Вложенный блок: пользователи попадут в пакет внешнего
+        yield
+        return
+
+    _provisioning.pending = {}
+    try:
+        yield
+        pending = _provisioning.pending
+    finally:
+        _provisioning.pending = None
+
+    with_profiles = [pk for pk, profile in pending.items() if profile]
+    rating_only = [pk for pk, profile in pending.items() if not profile]
+    if with_profiles:
+        provision_users(with_profiles)
+    if rating_only:
+        provision_users(rating_only, with_profiles=False)
 
 
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    """Создать профиль при создании пользователя"""
-    # Пропускаем создание профиля, если он уже создается через форму регистрации
-    if created and not getattr(instance, '_creating_profile_via_form', False):
+def provision_new_user(sender, instance, created, raw=False, **kwargs):
+    """Создать профиль и рейтинг при создании пользователя"""
+    if not created or raw:
+        return
+
+    # Профиль с настоящим телефоном создает форма регистрации
+    with_profile = not getattr(instance, '_creating_profile_via_form', False)
+
+    pending = getattr(_provisioning, 'pending', None)
+    if pending is not None:
+        pending[instance.pk] = with_profile
+        return
+
+    try:
+        # У только что созданного пользователя профиля и рейтинга еще нет:
+        # пишем их сразу, без поиска пользователей без записей
+        with transaction.atomic():
+            if with_profile:
+                UserProfile.objects.create_placeholder(instance.pk)
+            PlayerRating.objects.create_default(instance.pk)
+    except Exception as e:
+        # Если ошибка, логируем но не падаем
+        logger.error("Ошибка создания профиля для %s: %s", instance.username, e, exc_info=True)
+
+
+@receiver(post_save, sender=User)
+def refresh_navbar(sender, instance, created, raw=False, **kwargs):
+    """Имя пользователя выводится в навигации"""
+    if not created and not raw:
+        invalidate_navbar_on_commit(instance.pk)
+
+
+class PlayerRatingManager(models.Manager):
+    def create_missing(self, user_ids=None, batch_size=500):
+        """
+        Создать рейтинг по умолчанию пользователям без рейтинга.
+        Один anti-join и bulk_create; возвращает количество пользователей,
+        которым нужен был рейтинг.
+        """
+        users = User.objects.filter(rating__isnull=True)
+        if user_ids is not None:
+            users = users.filter(pk__in=user_ids)
+
+        missing = list(users.values_list('pk', flat=True))
+        if not missing:
+            return 0
+
+        # bulk_create не вызывает save, поэтому уровень задаем сразу
+        self.bulk_create([
+            PlayerRating(user_id=user_id, numeric_rating=Decimal('1.00'), level='D')
+            for user_id in missing
+        ], batch_size=batch_size, ignore_conflicts=True)
+        return len(missing)
+
+    def create_default(self, user_id):
+        """Рейтинг по умолчанию для только что созданного пользователя - одна вставка"""
+        return self.bulk_create([PlayerRating(user_id=user_id, numeric_rating=Decimal('1.00'), level='D')])[0]
+
+    def for_user(self, user):
+        """Рейтинг пользователя; пользователям, созданным до рейтингов, он создается на лету"""
         try:
-            with transaction.atomic():
-                import time
-                # Генерируем уникальный временный телефон
-                timestamp = int(time.time() * 1000) % 1000000
-                base_phone = f'+7980{timestamp:06d}'
-
-                # Убеждаемся в уникальности
-                phone = base_phone
-                counter = 1
-                while UserProfile.objects.filter(phone=phone).exists() and counter < 100:
-                    phone = f'+7980{(timestamp + counter) % 1000000:06d}'
-                    counter += 1
-
-                if counter >= 100:
-                    # Если не удалось найти уникальный, генерируем случайный
-                    import random
-                    phone = f'+7980{random.randint(1000000, 9999999)}'
-
-                UserProfile.objects.create(user=instance, phone=phone)
-        except Exception as e:
-            # Если ошибка, логируем но не падаем
-            import sys
-            print(f"Ошибка создания профиля для {instance.username}: {e}", file=sys.stderr)
+            return user.rating
+        except PlayerRating.DoesNotExist:
+            provision_users([user.pk], with_profiles=False)
+            return self.get(user=user)
 
 
 class PlayerRating(models.Model):
@@ -396,6 +567,8 @@ class PlayerRating(models.Model):
         verbose_name='История рейтинга'
     )
 
+    objects = PlayerRatingManager()
+
     class Meta:
         verbose_name = 'Рейтинг игрока'
         verbose_name_plural = 'Рейтинги игроков'
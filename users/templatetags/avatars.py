@@ -0,0 +1,15 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def avatar_url(profile, size):
+    """URL JPEG-аватарки профиля для показа в size пикселей: {{ profile|avatar_url:64 }}"""
+    return profile.get_avatar_url(int(size)) or ''
+
+
+@register.filter
+def avatar_webp_url(profile, size):
+    """URL WebP-аватарки профиля для показа в size пикселей"""
+    return profile.get_avatar_url(int(size), ext='webp') or ''
@@ -20,5 +20,6 @@ urlpatterns = [
     path('ajax/resend-verification-code/', views.resend_verification_code, name='ajax_resend_verification_code'),
     path('ajax/upload-avatar/', views.upload_avatar, name='ajax_upload_avatar'),
     path('ajax/delete-avatar/', views.delete_avatar, name='ajax_delete_avatar'),
+    path('ajax/avatar-status/', views.avatar_status, name='ajax_avatar_status'),
     path('ajax/update-profile/', views.update_profile, name='ajax_update_profile'),
 ]
\ No newline at end of file
@@ -1,16 +1,19 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
 from django.http import JsonResponse
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.core.exceptions import ValidationError
 from .forms import RegistrationForm, LoginForm, EmailUpdateForm, PhoneVerificationForm, AvatarUploadForm
+from .models import UserProfile
+from . import avatar_jobs
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils import timezone
-from django.db.models import Prefetch, Count, Q
-from datetime import datetime, timedelta
-from booking.models import Booking, Court
-import json
+from booking.models import Booking, annotate_time_flags, upcoming_q
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 @require_POST
@@ -50,9 +53,7 @@ def ajax_register(request):
 
     except Exception as e:
         # Логируем ошибку для отладки
-        print(f"Ошибка при регистрации: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Ошибка при регистрации: %s", e, exc_info=True)
         return JsonResponse({
             'success': False,
             'message': f'Ошибка сервера: {str(e)}'
@@ -107,9 +108,7 @@ def ajax_login(request):
         })
 
     except Exception as e:
-        print(f"Ошибка при входе: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Ошибка при входе: %s", e, exc_info=True)
         return JsonResponse({
             'success': False,
             'message': f'Ошибка сервера: {str(e)}'
@@ -204,9 +203,7 @@ def update_email(request):
         })
 
     except Exception as e:
-        print(f"Ошибка при обновлении email: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Ошибка при обновлении email: %s", e, exc_info=True)
         return JsonResponse({
             'success': False,
             'message': f'Ошибка сервера: {str(e)}'
@@ -255,9 +252,7 @@ def verify_phone(request):
         })
 
     except Exception as e:
-        print(f"Ошибка при подтверждении телефона: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Ошибка при подтверждении телефона: %s", e, exc_info=True)
         return JsonResponse({
             'success': False,
             'message': f'Ошибка сервера: {str(e)}'
@@ -272,11 +267,10 @@ def resend_verification_code(request):
     try:
         if hasattr(request.user, 'profile'):
             # Генерируем новый код
-            code = request.user.profile.generate_verification_code()
+            request.user.profile.generate_verification_code()
 
             # В реальном приложении здесь был бы код отправки SMS
-            # Для тестирования просто логируем
-            print(f"Код подтверждения для {request.user.profile.phone}: {code}")
+            logger.debug("Повторная отправка кода подтверждения для %s", request.user.username)
 
             return JsonResponse({
                 'success': True,
@@ -289,9 +283,7 @@ def resend_verification_code(request):
             })
 
     except Exception as e:
-        print(f"Ошибка при отправке кода: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Ошибка при отправке кода: %s", e, exc_info=True)
         return JsonResponse({
             'success': False,
             'message': f'Ошибка сервера: {str(e)}'
@@ -315,16 +307,14 @@ def upload_avatar(request):
         if form.is_valid():
             avatar = form.cleaned_data['avatar']
 
-            # Сохраняем аватарку через метод модели
+            # Сохраняем исходный файл, обработка идет в фоне
             request.user.profile.save_avatar(avatar)
 
-            # Получаем URL новой аватарки
-            avatar_url = request.user.profile.get_avatar_url()
-
             return JsonResponse({
                 'success': True,
-                'message': 'Аватар успешно загружен!',
-                'avatar_url': avatar_url if avatar_url else ''
+                'pending': True,
+                'message': 'Аватар загружен и обрабатывается...',
+                'status_url': reverse('ajax_avatar_status')
             })
 
         # Возвращаем ошибки
@@ -350,15 +340,34 @@ def upload_avatar(request):
             'message': str(e)
         })
     except Exception as e:
-        print(f"Ошибка при загрузке аватарки: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Ошибка при загрузке аватарки: %s", e, exc_info=True)
         return JsonResponse({
             'success': False,
             'message': f'Ошибка сервера: {str(e)}'
         }, status=500)
 
 
+@login_required
+def avatar_status(request):
+    """AJAX состояние фоновой обработки аватарки"""
+    profiles = UserProfile.objects.filter(user=request.user).only(
+        'avatar', 'avatar_pending', 'avatar_pending_since', 'avatar_failed'
+    )
+    profile = profiles.get()
+    if avatar_jobs.is_stale(profile):
+        # Задача потеряна (например, при перезапуске сервера)
+        avatar_jobs.expire_pending(profiles)
+        profile = profiles.get()
+    avatar_url = profile.get_avatar_url()
+
+    return JsonResponse({
+        'success': True,
+        'pending': bool(profile.avatar_pending),
+        'failed': profile.avatar_failed,
+        'avatar_url': avatar_url if avatar_url else ''
+    })
+
+
 @require_POST
 @csrf_exempt
 @login_required
@@ -384,9 +393,7 @@ def delete_avatar(request):
             })
 
     except Exception as e:
-        print(f"Ошибка при удалении аватарки: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Ошибка при удалении аватарки: %s", e, exc_info=True)
         return JsonResponse({
             'success': False,
             'message': f'Ошибка сервера: {str(e)}'
@@ -434,9 +441,7 @@ def update_profile(request):
         })
 
     except Exception as e:
-        print(f"Ошибка при обновлении профиля: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Ошибка при обновлении профиля: %s", e, exc_info=True)
         return JsonResponse({
             'success': False,
             'message': f'Ошибка сервера: {str(e)}'
@@ -460,86 +465,33 @@ def profile(request):
 
     # Получаем пользователя с профилем
     try:
-        user = User.objects.select_related('profile').get(id=request.user.id)
+        user = User.objects.select_related('profile', 'rating').get(id=request.user.id)
     except User.DoesNotExist:
         user = request.user
 
     # Получаем рейтинг пользователя
-    try:
-        rating = user.rating
-    except PlayerRating.DoesNotExist:
-        # Создаем рейтинг по умолчанию если его нет
-        rating = PlayerRating.objects.create(
-            user=user,
-            numeric_rating=1.00,
-            level='D'
-        )
-
-    # Получаем бронирования с оптимизацией запросов
+    rating = PlayerRating.objects.for_user(user)
+
+    # Одно "сейчас" на весь запрос: и для выборки, и для флагов карточек
+    now = timezone.localtime()
+    today = now.date()
+
+    # Сразу рендерим только предстоящие бронирования,
+    # история подгружается порциями через booking_history
     bookings = Booking.objects.filter(
+        upcoming_q(today, now.time()),
         user=request.user
     ).select_related(
         'court'  # JOIN вместо отдельных запросов
     ).order_by(
-        '-date', '-start_time'
+        '-date', '-start_time', '-id'
     )
 
-    today = timezone.now().date()
-    current_time = timezone.now().time()
-
-    # Создаем список бронирований с дополнительными данными
-    bookings_with_extra = []
-
-    for booking in bookings:
-        # Рассчитываем полную дату начала бронирования
-        booking_datetime = timezone.make_aware(
-            datetime.combine(booking.date, booking.start_time)
-        )
-
-        # Можно ли подтвердить? (за 24 часа до начала)
-        time_diff = booking_datetime - timezone.now()
-        can_confirm = timedelta(hours=0) < time_diff <= timedelta(hours=24)
-
-        # Сколько часов осталось до возможности подтверждения
-        if time_diff > timedelta(hours=24):
-            hours_until = (time_diff - timedelta(hours=24)).total_seconds() / 3600
-            hours_until_confirmation = max(0, int(hours_until))
-        else:
-            hours_until_confirmation = 0
-
-        # Прошедшее ли бронирование?
-        is_past = booking.date < today or (
-                booking.date == today and booking.start_time < current_time
-        )
-
-        # Можно ли отменить? (не прошедшее и не отмененное)
-        can_cancel = (
-                not is_past and
-                booking.status in ['pending', 'confirmed']
-        )
-
-        # Сохраняем бронирование с дополнительными данными
-        bookings_with_extra.append({
-            'booking': booking,
-            'can_confirm': can_confirm,
-            'hours_until_confirmation': hours_until_confirmation,
-            'is_past': is_past,
-            'can_cancel': can_cancel,
-            'today': today
-        })
+    # Бронирования с флагами подтверждения и отмены
+    bookings_with_extra = annotate_time_flags(bookings, now)
 
     # Статистика для пользователя
-    booking_stats = {
-        'total': bookings.count(),
-        'confirmed': bookings.filter(status='confirmed').count(),
-        'pending': bookings.filter(status='pending').count(),
-        'cancelled': bookings.filter(status='cancelled').count(),
-        'upcoming': bookings.filter(
-            Q(date__gt=today) |
-            Q(date=today, start_time__gt=current_time),
-            status__in=['pending', 'confirmed']
-        ).count(),
-    }
+    booking_stats = Booking.objects.stats_for_user(request.user)
 
     # Получаем активную вкладку из GET-параметра или session
     active_tab = request.GET.get('tab', 'profile')
@@ -547,8 +499,10 @@ def profile(request):
     # ВАЖНО: Рассчитываем процент прогресса для отображения
     progress_percentage = rating.get_progress_percentage()
 
-    # Отладочный вывод
-    print(f"DEBUG - Рейтинг: {rating.numeric_rating}, Уровень: {rating.level}, Прогресс: {progress_percentage}%")
+    logger.debug(
+        "profile: рейтинг %s, уровень %s, прогресс %s%%",
+        rating.numeric_rating, rating.level, progress_percentage
+    )
 
     # Также получаем границы диапазона для текущего уровня
     range_min = rating.get_range_min()
@@ -557,6 +511,7 @@ def profile(request):
     context = {
         'user': user,
         'bookings_with_extra': bookings_with_extra,  # Передаем обновленный список
+        'has_history': booking_stats['total'] > len(bookings_with_extra),
         'today': today,
         'booking_stats': booking_stats,
         'active_tab': active_tab,
@@ -581,7 +536,7 @@ def is_coach(user):
 @login_required
 def rating_detail(request):
     """Страница с подробной информацией о рейтинге пользователя"""
-    rating = request.user.rating
+    rating = PlayerRating.objects.for_user(request.user)
 
     # История рейтинга
     history = rating.rating_history if hasattr(rating, 'rating_history') else []
@@ -657,7 +612,7 @@ def update_player_rating(request, user_id):
 def get_rating_info(request):
     """AJAX получение информации о рейтинге"""
     try:
-        rating = request.user.rating
+        rating = PlayerRating.objects.for_user(request.user)
 
         return JsonResponse({
             'success': True,